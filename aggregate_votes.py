@@ -0,0 +1,159 @@
+import json
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from export_votes import VOTES_DB, open_store, connect_firestore
+
+# --- KONFIGURASYON ---
+SNAPSHOT_FILE = 'sonuc_ozeti.json'
+
+# Firestore'da ozetin yazildigi belge (panolar tek istekte okur)
+SNAPSHOT_COLLECTION = 'results'
+SNAPSHOT_DOC = 'leaderboard'
+
+# Tutarsizlik raporunda ekrana basilan en fazla satir (hepsi JSON'a yazilir)
+MAX_MISMATCH_LINES = 20
+
+# Oylama arayuzundeki puanlar
+SCORES = [1, 2, 3, 4, 5]
+
+def aggregate(votes):
+    """
+    votes: photoId, juryEmail, score kolonlu DataFrame.
+    (photos, jurors) dondurur. photos: fotograf basina toplam, oy sayisi,
+    ortalama, juri-normalize puan ve siralar; jurors: juri basina oy
+    sayisi, ortalama, sapma ve puan dagilimi.
+    """
+    scores = votes['score'].astype(float)
+    by_juror = scores.groupby(votes['juryEmail'])
+    # Juri-normalize puan: her jurinin puani kendi ortalama/sapmasina gore z-skoru
+    # (hep yuksek ya da hep dusuk veren juri siralamayi tek basina kaydirmasin)
+    juror_std = by_juror.transform('std').replace(0, np.nan)
+    z = ((scores - by_juror.transform('mean')) / juror_std).fillna(0.0)
+
+    photos = scores.groupby(votes['photoId']).agg(totalScore='sum', voteCount='count', average='mean')
+    photos['normalizedScore'] = z.groupby(votes['photoId']).mean()
+    photos['totalScore'] = photos['totalScore'].astype(int)
+    # Sira: toplam puan (admin paneliyle ayni), esitlikte ortalama
+    photos = photos.sort_values(['totalScore', 'average'], ascending=[False, False], kind='mergesort')
+    photos['rank'] = np.arange(1, len(photos) + 1)
+    photos['averageRank'] = photos['average'].rank(method='min', ascending=False).astype(int)
+    photos['normalizedRank'] = photos['normalizedScore'].rank(method='min', ascending=False).astype(int)
+
+    jurors = by_juror.agg(voteCount='count', average='mean', std='std')
+    # Arayuz disinda kalan puanlar (eski/elle girilmis oylar) da dagilimda gorunsun
+    columns = sorted(set(SCORES) | set(votes['score'].astype(int)))
+    distribution = pd.crosstab(votes['juryEmail'], votes['score'].astype(int)).reindex(columns=columns, fill_value=0)
+    distribution.columns = [str(c) for c in distribution.columns]
+    jurors = jurors.join(distribution)
+    return photos, jurors
+
+def check_consistency(photos, stored):
+    """
+    Oylardan hesaplanan toplamlari Firestore'daki totalScore/voteCount
+    sayaclariyla karsilastirir. stored: {photoId: (totalScore, voteCount)}.
+    Uyusmayanlarin listesini dondurur.
+    """
+    computed = photos[['totalScore', 'voteCount']]
+    counters = pd.DataFrame.from_dict(stored, orient='index', columns=['storedTotalScore', 'storedVoteCount'])
+    merged = counters.join(computed, how='outer').fillna(0)
+    bad = merged[(merged['totalScore'] != merged['storedTotalScore']) | (merged['voteCount'] != merged['storedVoteCount'])]
+    return [
+        {"id": photo_id, "totalScore": int(row['totalScore']), "voteCount": int(row['voteCount']),
+         "storedTotalScore": int(row['storedTotalScore']), "storedVoteCount": int(row['storedVoteCount'])}
+        for photo_id, row in bad.iterrows()
+    ]
+
+def build_snapshot(photos, jurors, mismatches=None):
+    distribution_columns = [c for c in jurors.columns if c not in ('voteCount', 'average', 'std')]
+    leaderboard = [
+        {"id": photo_id, "rank": int(row['rank']), "totalScore": int(row['totalScore']),
+         "voteCount": int(row['voteCount']), "average": round(float(row['average']), 3),
+         "averageRank": int(row['averageRank']), "normalizedScore": round(float(row['normalizedScore']), 4),
+         "normalizedRank": int(row['normalizedRank'])}
+        for photo_id, row in photos.iterrows()
+    ]
+    juror_list = [
+        {"email": email, "voteCount": int(row['voteCount']), "average": round(float(row['average']), 3),
+         "std": round(float(row['std']), 3) if pd.notna(row['std']) else None,
+         "distribution": {c: int(row[c]) for c in distribution_columns}}
+        for email, row in jurors.iterrows()
+    ]
+    snapshot = {
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "photoCount": len(leaderboard),
+        "jurorCount": len(juror_list),
+        "voteCount": int(photos['voteCount'].sum()),
+        "leaderboard": leaderboard,
+        "jurors": juror_list,
+    }
+    if mismatches is not None:
+        snapshot["consistency"] = {"ok": not mismatches, "mismatches": mismatches}
+    return snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel oy deposundan siralama ozeti (leaderboard snapshot) uretir.")
+    parser.add_argument("--store", default=VOTES_DB, help="Ortak yerel veritabani (export_votes.py doldurur)")
+    parser.add_argument("--output", default=SNAPSHOT_FILE, help="Ozet JSON dosyasi")
+    parser.add_argument("--sync", action="store_true", help="Once yeni oylari Firestore'dan cek")
+    parser.add_argument("--check", action="store_true", help="Firestore'daki totalScore/voteCount sayaclarini kontrol et (once --sync yapar)")
+    parser.add_argument("--publish", action="store_true", help=f"Ozeti Firestore'a yaz ({SNAPSHOT_COLLECTION}/{SNAPSHOT_DOC})")
+    parser.add_argument("--emulator", default=None, help="Firestore yerine bu klasordeki yerel emulatoru kullan")
+    args = parser.parse_args()
+
+    db = None
+    if args.sync or args.check or args.publish:
+        if args.emulator:
+            from firebase_local import connect_local
+            _, db = connect_local(args.emulator)
+        else:
+            db = connect_firestore()
+        if db is None:
+            return
+
+    conn = open_store(args.store)
+    try:
+        # Kontrol eski bir depoyla yapilirsa yeni oy alan her fotograf uyusmaz gorunur
+        if args.sync or args.check:
+            from export_votes import sync_votes
+            sync_votes(db, conn)
+        votes = pd.read_sql_query("SELECT photoId, juryEmail, score FROM votes WHERE score IS NOT NULL", conn)
+    finally:
+        conn.close()
+    if votes.empty:
+        print("Hic oy bulunamadi.")
+        return
+
+    photos, jurors = aggregate(votes)
+
+    mismatches = None
+    if args.check:
+        stored = {}
+        for doc in db.collection('photos').stream():
+            data = doc.to_dict()
+            stored[doc.id] = (data.get('totalScore', 0) or 0, data.get('voteCount', 0) or 0)
+        mismatches = check_consistency(photos, stored)
+        if mismatches:
+            print(f"⚠️  {len(mismatches)} fotografta sayaclar oylarla uyusmuyor:")
+            for m in mismatches[:MAX_MISMATCH_LINES]:
+                print(f"   {m['id']}: oylar {m['totalScore']}/{m['voteCount']}, Firestore {m['storedTotalScore']}/{m['storedVoteCount']}")
+            if len(mismatches) > MAX_MISMATCH_LINES:
+                print(f"   ... (tam liste: {args.output})")
+        else:
+            print("✅ Firestore sayaclari oylarla tutarli.")
+
+    snapshot = build_snapshot(photos, jurors, mismatches)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=1)
+    print(f"✅ {snapshot['photoCount']} fotograf, {snapshot['jurorCount']} juri, {snapshot['voteCount']} oy -> {args.output}")
+
+    if args.publish:
+        db.collection(SNAPSHOT_COLLECTION).document(SNAPSHOT_DOC).set(snapshot)
+        print(f"Ozet Firestore'a yazildi: {SNAPSHOT_COLLECTION}/{SNAPSHOT_DOC}")
+
+    for entry in snapshot["leaderboard"][:3]:
+        print(f"   {entry['rank']}. {entry['id']}: {entry['totalScore']} puan, {entry['voteCount']} oy, ort. {entry['average']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import argparse
+
+# Scriptlerin ortak veri katmani (SQLite). Katilimci eslesmesi ve oylar burada
+# tutulur; Excel sadece istenirse uretilen bir gorunumdur. Foto ID ve juri
+# uzerinde indeks oldugundan sorgular tum tabloyu taramaz.
+
+# Yarisma dosyalarinin bulundugu ana dizin (yarisma_duzenleyici.py ile ayni)
+ANA_DIZIN = "/Volumes/KIOXIA/fotograf_yarismasi"
+
+# Butun scriptler varsayilan olarak bu tek dosyayi kullanir; calisma dizinine
+# bagli degildir. YARISMA_DB ortam degiskeniyle degistirilebilir.
+DB_FILENAME = 'yarisma.sqlite'
+DB_PATH = os.environ.get('YARISMA_DB') or os.path.join(ANA_DIZIN, DB_FILENAME)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    source TEXT PRIMARY KEY,            -- katilimci/orijinal dosya adi
+    photo_id TEXT UNIQUE,               -- YARISMA_ID_001; havuza alinmayanlarda NULL
+    jury_file TEXT,                     -- YARISMA_ID_001.jpg
+    participant TEXT NOT NULL,
+    original_name TEXT NOT NULL,
+    content_hash TEXT,
+    width INTEGER,
+    height INTEGER,
+    bytes INTEGER,
+    orientation INTEGER,
+    captured_at TEXT,                   -- ISO 8601
+    reject_reason TEXT,
+    duplicate_kind TEXT,                -- 'ayni' / 'benzer'
+    duplicate_of TEXT,                  -- asil fotografin photo_id'si
+    hamming INTEGER
+);
+CREATE INDEX IF NOT EXISTS participants_participant ON participants(participant);
+
+CREATE TABLE IF NOT EXISTS votes (
+    id TEXT PRIMARY KEY,
+    photoId TEXT,
+    score INTEGER,
+    juryEmail TEXT,
+    comment TEXT,
+    timestamp TEXT,                     -- ISO 8601
+    extra TEXT                          -- Firestore'daki diger alanlar (JSON)
+);
+CREATE INDEX IF NOT EXISTS votes_photo ON votes(photoId);
+CREATE INDEX IF NOT EXISTS votes_juror ON votes(juryEmail);
+
+CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+PARTICIPANT_COLUMNS = [
+    'source', 'photo_id', 'jury_file', 'participant', 'original_name', 'content_hash',
+    'width', 'height', 'bytes', 'orientation', 'captured_at',
+    'reject_reason', 'duplicate_kind', 'duplicate_of', 'hamming',
+]
+
+# Excel gorunumundeki kolon basliklari (eski KATILIMCI_ESLESME_LISTESI ile ayni)
+PARTICIPANT_HEADERS = {
+    'jury_file': 'Jüri Dosya Adı',
+    'participant': 'Katılımcı Adı',
+    'original_name': 'Orijinal Dosya Adı',
+    'reject_reason': 'Reddedilme Nedeni',
+    'width': 'Genişlik',
+    'height': 'Yükseklik',
+    'bytes': 'Dosya Boyutu (bayt)',
+    'orientation': 'Yön (EXIF)',
+    'captured_at': 'Çekim Zamanı',
+    'duplicate_kind': 'Kopya Durumu',
+    'duplicate_of': 'Benzediği Fotoğraf',
+    'hamming': 'Hamming Mesafesi',
+}
+
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def replace_participants(conn, rows):
+    """Katilimci tablosunu tek islemde yeniler. rows: PARTICIPANT_COLUMNS anahtarli sozlukler."""
+    with conn:
+        conn.execute("DELETE FROM participants")
+        conn.executemany(
+            f"INSERT INTO participants ({', '.join(PARTICIPANT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in PARTICIPANT_COLUMNS)})",
+            [tuple(row.get(c) for c in PARTICIPANT_COLUMNS) for row in rows])
+
+def participant_names(conn):
+    """{juri dosya adi: katilimci adi}; sadece havuzdaki fotograflar."""
+    return dict(conn.execute(
+        "SELECT jury_file, participant FROM participants WHERE jury_file IS NOT NULL ORDER BY photo_id"))
+
+def participants_frame(conn):
+    """Excel gorunumu icin DataFrame (ID sirasinda, havuza alinmayanlar sonda)."""
+    import pandas as pd
+
+    columns = list(PARTICIPANT_HEADERS)
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(columns)} FROM participants "
+        "ORDER BY photo_id IS NULL, length(photo_id), photo_id, source", conn)
+    df['duplicate_of'] = df['duplicate_of'].map(
+        dict(conn.execute("SELECT photo_id, jury_file FROM participants WHERE photo_id IS NOT NULL"))).fillna('')
+    df['duplicate_kind'] = df['duplicate_kind'].map({'ayni': 'Aynı dosya', 'benzer': 'Çok benzer'}).fillna('')
+    df.loc[df['duplicate_kind'].ne('') & df['jury_file'].isna(), 'duplicate_kind'] += ' (atlandı)'
+    return df.rename(columns=PARTICIPANT_HEADERS)
+
+def votes_frame(conn):
+    """Excel gorunumu icin oylar; ek alanlar (varsa) sona kolon olarak eklenir."""
+    import json
+    import pandas as pd
+
+    df = pd.read_sql_query(
+        "SELECT photoId, score, juryEmail, comment, replace(substr(timestamp, 1, 19), 'T', ' ') AS timestamp, extra "
+        "FROM votes ORDER BY photoId", conn)
+    extras = df.pop('extra')
+    if extras.notna().any():
+        extra_df = pd.DataFrame([json.loads(e) if e else {} for e in extras], index=df.index)
+        df = pd.concat([df, extra_df], axis=1)
+    return df
+
+def export_excel(df, output_file):
+    """DataFrame'i Excel'e yazar; openpyxl yoksa CSV'ye duser. Yazilan dosyayi dondurur."""
+    try:
+        df.to_excel(output_file, index=False)
+        return output_file
+    except Exception as e:
+        print(f"Kaydetme hatasi: {e}")
+        csv_file = os.path.splitext(output_file)[0] + '.csv'
+        df.to_csv(csv_file, index=False)
+        print(f"Excel hatasi nedeniyle CSV olarak kaydedildi: {csv_file}")
+        return csv_file
+
+def main():
+    parser = argparse.ArgumentParser(description="Ortak veritabanindan tablo ozeti ya da Excel gorunumu uretir.")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite veritabani")
+    parser.add_argument("--excel", nargs=2, metavar=("TABLO", "DOSYA"),
+                        help="participants ya da votes tablosunu Excel'e yaz")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        if args.excel:
+            table, output_file = args.excel
+            frames = {'participants': participants_frame, 'votes': votes_frame}
+            if table not in frames:
+                parser.error(f"Bilinmeyen tablo: {table} (participants, votes)")
+            print(f"✅ {export_excel(frames[table](conn), output_file)}")
+        else:
+            for table in ('participants', 'votes'):
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                print(f"{table}: {count} satir")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+
+# Havuza alinirken ayni ve cok benzer fotograflari bulur.
+# Ayni dosya: icerik ozeti (SHA-256) sozlugunde O(1) arama, resim acilmaz.
+# Benzer: image_similarity_grouper'in pHash'i ve HammingIndex'i; ikili
+# karsilastirma yapilmaz, binlerce fotografta da hizli kalir.
+
+GROUPER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_similarity_grouper")
+
+# group_similar_images ile ayni anlam: mesafe < esik ise benzer
+BENZERLIK_ESIGI = 5
+
+def _grouper():
+    if GROUPER_DIR not in sys.path:
+        sys.path.insert(0, GROUPER_DIR)
+    from group_similar_images import compute_hashes
+    from hamming_index import HammingIndex, hash_to_int
+    return compute_hashes, HammingIndex, hash_to_int
+
+def _load_cache(path):
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def _save_cache(path, cache):
+    if not path:
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+def phash_values(paths, digests, cache_path=None, workers=None):
+    """
+    {yol: 64 bit pHash (int)}. pHash icerik ozetine gore onbellekte tutulur;
+    sadece yeni iceriklerin resmi acilir (tam cozunurlukte; compute_hashes varsayilani).
+    """
+    cache = _load_cache(cache_path)
+    todo = [p for p in paths if digests[p] not in cache]
+    if todo:
+        compute_hashes, _, hash_to_int = _grouper()
+        print(f"{len(todo)} fotoğrafın pHash'i hesaplanıyor...")
+        hashes, _ = compute_hashes(todo, algorithms=('phash',), workers=workers)
+        for path, result in hashes.items():
+            cache[digests[path]] = hash_to_int(result['phash'])
+        _save_cache(cache_path, cache)
+    return {p: cache[digests[p]] for p in paths if digests[p] in cache}
+
+def find_duplicates(paths, digests, threshold=BENZERLIK_ESIGI, cache_path=None, workers=None):
+    """
+    paths: oncelik sirasinda (ilk gelen asil sayilir) kaynak yollari.
+    digests: {yol: icerik ozeti}.
+    {kopya yol: (tur, asil yol, hamming mesafesi)} dondurur; tur 'ayni' ya da 'benzer'.
+    threshold <= 0 ise sadece ayni dosyalar aranir.
+    """
+    duplicates = {}
+    first_by_digest = {}
+    unique = []
+    for path in paths:
+        original = first_by_digest.setdefault(digests[path], path)
+        if original != path:
+            duplicates[path] = ('ayni', original, 0)
+        else:
+            unique.append(path)
+
+    if threshold <= 0 or len(unique) < 2:
+        return duplicates
+
+    _, HammingIndex, _ = _grouper()
+    values = phash_values(unique, digests, cache_path, workers)
+    index = HammingIndex(max_distance=threshold - 1)
+    owners = []
+    for path in unique:
+        value = values.get(path)
+        if value is None:
+            continue # okunamayan resim; benzerlik kontrolu yapilamaz
+        position = index.first_within(value)
+        if position < 0:
+            index.add(value)
+            owners.append((path, value))
+        else:
+            original, original_value = owners[position]
+            duplicates[path] = ('benzer', original, bin(value ^ original_value).count("1"))
+
+    # Ayni dosyanin asli baska bir fotografa benziyorsa kopya da o fotografa baglanir
+    for path, (kind, original, distance) in list(duplicates.items()):
+        if kind == 'ayni' and original in duplicates:
+            duplicates[path] = duplicates[original]
+    return duplicates
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+
+# Web icin turev boyutlari: uzun kenar (piksel) ve kalite
+# thumb: liste/onizleme, grid: galeri kartlari, full: oylama penceresi
+DERIVATIVE_SIZES = {
+    "full": (2048, 85),
+    "grid": (800, 80),
+    "thumb": (320, 70),
+}
+
+FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+
+def derivative_paths(filename, out_dir, fmt="webp"):
+    """{boyut adi: turev dosya yolu}; ornek: <out_dir>/grid/YARISMA_ID_001.webp"""
+    stem = os.path.splitext(filename)[0]
+    return {size: os.path.join(out_dir, size, f"{stem}.{fmt}") for size in DERIVATIVE_SIZES}
+
+def build_derivatives(src_path, out_dir, fmt="webp"):
+    """
+    Bir fotografin turevlerini uretir. EXIF yonu piksellere uygulanir ve
+    metadata yazilmaz, boylece tarayici resmi tekrar dondurmez. Kaynaktan
+    yeni turevler varsa tekrar uretilmez. {boyut adi: yol} dondurur.
+    """
+    paths = derivative_paths(os.path.basename(src_path), out_dir, fmt)
+    src_mtime = os.path.getmtime(src_path)
+    if all(os.path.exists(p) and os.path.getmtime(p) >= src_mtime for p in paths.values()):
+        return paths
+
+    largest = max(edge for edge, _ in DERIVATIVE_SIZES.values())
+    with Image.open(src_path) as img:
+        # JPEG'ler dogrudan kucultulmus olarak acilir (en buyuk turevden kucuk olmamak uzere)
+        img.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+
+    # Buyukten kucuge; her turev bir oncekinden kucultulur
+    for size, (edge, quality) in sorted(DERIVATIVE_SIZES.items(), key=lambda item: -item[1][0]):
+        img.thumbnail((edge, edge), Image.LANCZOS)
+        os.makedirs(os.path.dirname(paths[size]), exist_ok=True)
+        tmp_path = paths[size] + ".tmp"
+        img.save(tmp_path, FORMATS[fmt], quality=quality)
+        os.replace(tmp_path, paths[size])
+    return paths
+
+def _build(job):
+    src_path, out_dir, fmt = job
+    try:
+        return src_path, build_derivatives(src_path, out_dir, fmt)
+    except Exception as e:
+        print(f"HATA: {os.path.basename(src_path)} icin turev uretilemedi: {e}")
+        return src_path, None
+
+def build_all(src_paths, out_dir, fmt="webp", workers=None):
+    """
+    Turevleri tum cekirdeklerde paralel uretir.
+    {kaynak yol: {boyut adi: yol}} dondurur; basarisiz olanlar dahil edilmez.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    jobs = [(p, out_dir, fmt) for p in src_paths]
+    if workers <= 1:
+        results = map(_build, jobs)
+        return {src: paths for src, paths in results if paths}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return {src: paths for src, paths in pool.map(_build, jobs, chunksize=4) if paths}
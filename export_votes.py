@@ -1,75 +1,136 @@
-import firebase_admin
-from firebase_admin import credentials
-from google.cloud import firestore
-import pandas as pd
 import os
-from datetime import datetime
+import json
+import argparse
+from datetime import datetime, timedelta
+import datastore
 
 # --- KONFIGURASYON ---
 SERVICE_ACCOUNT_PATH = 'serviceAccountKey.json'
 OUTPUT_FILE = 'oylama_sonuclari.xlsx'
 
-def export_votes():
+# Oylarin biriktirildigi ortak yerel veritabani; her calistirmada sadece yeni/degisen oylar eklenir
+VOTES_DB = datastore.DB_PATH
+
+# Firestore'dan tek istekte cekilen oy sayisi
+PAGE_SIZE = 500
+
+# Kaldigi yerden devam ederken geri sarilan sure: commit'i gec gorunen
+# (daha eski timestamp'li) oylar kacmasin. Tekrar gelen oylar ustune yazilir.
+OVERLAP = timedelta(minutes=5)
+
+VOTE_COLUMNS = ['photoId', 'score', 'juryEmail', 'comment', 'timestamp']
+
+def open_store(path=VOTES_DB):
+    return datastore.connect(path)
+
+def get_checkpoint(conn):
+    """Son aktarilan oyun zamani (datetime) ya da None."""
+    row = conn.execute("SELECT value FROM sync_state WHERE key = 'last_timestamp'").fetchone()
+    return datetime.fromisoformat(row[0]) if row else None
+
+def _vote_row(doc):
+    vote = doc.to_dict()
+    ts = vote.pop('timestamp', None)
+    extra = {k: v for k, v in vote.items() if k not in VOTE_COLUMNS}
+    return (
+        doc.id, vote.get('photoId'), vote.get('score'), vote.get('juryEmail'), vote.get('comment'),
+        ts.isoformat() if ts else None,
+        json.dumps(extra, ensure_ascii=False, default=str) if extra else None,
+    ), ts
+
+def sync_votes(db, conn, page_size=PAGE_SIZE, full=False):
+    """
+    Oylari timestamp sirasinda, start_after imleciyle sayfa sayfa ceker ve
+    yerel tabloya yazar (ayni oy ID'si guncellenir). Bellekte en fazla bir
+    sayfa tutulur. full=False ise son kontrol noktasindan devam eder.
+    Cekilen oy sayisini dondurur.
+    """
+    query = db.collection('votes').order_by('timestamp').order_by('__name__')
+    checkpoint = None if full else get_checkpoint(conn)
+    if checkpoint is not None:
+        query = query.where('timestamp', '>=', checkpoint - OVERLAP)
+        print(f"Son aktarim: {checkpoint}. Sadece yeni/degisen oylar cekiliyor...")
+
+    fetched = 0
+    last_doc = None
+    while True:
+        page = query.limit(page_size)
+        if last_doc is not None:
+            page = page.start_after(last_doc)
+        docs = list(page.stream())
+        if not docs:
+            break
+
+        rows = []
+        last_ts = None
+        for doc in docs:
+            row, ts = _vote_row(doc)
+            rows.append(row)
+            last_ts = ts or last_ts
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO votes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            # Her sayfadan sonra kontrol noktasi: yarida kesilirse buradan devam edilir
+            if last_ts is not None and (checkpoint is None or last_ts > checkpoint):
+                checkpoint = last_ts
+                conn.execute("INSERT OR REPLACE INTO sync_state VALUES ('last_timestamp', ?)", (checkpoint.isoformat(),))
+        fetched += len(docs)
+        last_doc = docs[-1]
+        if len(docs) < page_size:
+            break
+    return fetched
+
+def write_excel(conn, output_file=OUTPUT_FILE):
+    df = datastore.votes_frame(conn)
+    if df.empty:
+        print("Hic oy bulunamadi.")
+        return
+
+    saved = datastore.export_excel(df, output_file)
+    print(f"✅ Oylama sonuclari basariyla kaydedildi: {saved}")
+    print(f"Toplam {len(df)} oy bulundu.")
+
+def connect_firestore():
+    from google.cloud import firestore
+
     # 1. Firebase Baglantisi
     if not os.path.exists(SERVICE_ACCOUNT_PATH):
         print(f"HATA: '{SERVICE_ACCOUNT_PATH}' dosyasi bulunamadi!")
-        return
-
-    # Initialize Firebase explicitly for the 'foto' database if not already initialized
-    if not firebase_admin._apps:
-        cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
-        firebase_admin.initialize_app(cred)
+        return None
 
     # Connect to 'foto' database
-    db = firestore.Client.from_service_account_json(SERVICE_ACCOUNT_PATH, database='foto')
-    
-    print("Oylar veritabanindan cekiliyor...")
+    return firestore.Client.from_service_account_json(SERVICE_ACCOUNT_PATH, database='foto')
 
-    # 2. Oylari Çek
-    votes_ref = db.collection('votes')
-    docs = votes_ref.stream()
-
-    data = []
-    for doc in docs:
-        vote = doc.to_dict()
-        # Convert timestamp to string if present
-        ts = vote.get('timestamp')
-        if ts:
-            vote['timestamp'] = ts.strftime('%Y-%m-%d %H:%M:%S')
-        
-        data.append(vote)
-
-    if not data:
-        print("Hic oy bulunamadi.")
+def export_votes(store_path=VOTES_DB, output_file=None, page_size=PAGE_SIZE, full=False, emulator_dir=None):
+    if emulator_dir:
+        from firebase_local import connect_local
+        _, db = connect_local(emulator_dir)
+    else:
+        db = connect_firestore()
+    if db is None:
         return
 
-    # 3. Excel'e Kaydet
-    df = pd.DataFrame(data)
-    
-    # Organize columns (optional cleanup)
-    desired_order = ['photoId', 'score', 'juryEmail', 'comment', 'timestamp']
-    # Filter only columns that exist in data
-    cols = [c for c in desired_order if c in df.columns]
-    # Add any other columns at the end
-    remaining = [c for c in df.columns if c not in cols]
-    final_cols = cols + remaining
-    
-    df = df[final_cols]
-    
-    # Sort by photoId for better readability
-    if 'photoId' in df.columns:
-        df = df.sort_values(by='photoId')
+    print("Oylar veritabanindan cekiliyor...")
 
+    # 2. Oylari Cek (sayfali, artimli)
+    conn = open_store(store_path)
     try:
-        df.to_excel(OUTPUT_FILE, index=False)
-        print(f"✅ Oylama sonuclari basariyla kaydedildi: {OUTPUT_FILE}")
-        print(f"Toplam {len(df)} oy bulundu.")
-    except Exception as e:
-        print(f"Kaydetme hatasi: {e}")
-        # Fallback to CSV if Excel fails (e.g. missing openpyxl)
-        csv_file = OUTPUT_FILE.replace('.xlsx', '.csv')
-        df.to_csv(csv_file, index=False)
-        print(f"Excel hatasi nedeniyle CSV olarak kaydedildi: {csv_file}")
+        fetched = sync_votes(db, conn, page_size=page_size, full=full)
+        total = conn.execute("SELECT COUNT(*) FROM votes").fetchone()[0]
+        print(f"{fetched} oy cekildi; yerel depoda toplam {total} oy var ({store_path}).")
+
+        # 3. Istenirse Excel'e Kaydet (veriler veritabaninda; Excel sadece gorunum)
+        if output_file:
+            write_excel(conn, output_file)
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
-    export_votes()
+    parser = argparse.ArgumentParser(description="Oylari Firestore'dan ortak SQLite veritabanina aktarir (istenirse Excel'e de yazar).")
+    parser.add_argument("--store", default=VOTES_DB, help="Ortak yerel veritabani")
+    parser.add_argument("--excel", action="store_true", help="Oylari Excel'e de yaz")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Excel dosyasi")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Istek basina oy sayisi")
+    parser.add_argument("--full", action="store_true", help="Kontrol noktasini yok say, tum oylari tekrar cek")
+    parser.add_argument("--emulator", default=None, help="Firestore yerine bu klasordeki yerel emulatoru kullan")
+    args = parser.parse_args()
+    export_votes(args.store, args.output if args.excel else None, args.page_size, args.full, args.emulator)
@@ -0,0 +1,230 @@
+import os
+import json
+import base64
+import hashlib
+import time
+import shutil
+import threading
+from datetime import datetime
+
+# Yerel Firebase yerine gecen siniflar (emulator stand-in).
+# Storage bir klasore, Firestore bir JSON dosyasina yazilir; uploader ve
+# diger scriptler internet ve servis hesabi olmadan denenebilir.
+# `latency` her istege eklenen gecikmedir (saniye), ag gidis-donusunu taklit eder.
+
+class LocalBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    @property
+    def path(self):
+        return os.path.join(self.bucket.root, self.name)
+
+    @property
+    def public_url(self):
+        return f"file://{os.path.abspath(self.path)}"
+
+    @property
+    def md5_hash(self):
+        with open(self.path, 'rb') as f:
+            return base64.b64encode(hashlib.md5(f.read()).digest()).decode('ascii')
+
+    @property
+    def crc32c(self):
+        return None
+
+    def upload_from_filename(self, filename, predefined_acl=None, **kwargs):
+        self.bucket._request()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        shutil.copyfile(filename, self.path)
+
+    def make_public(self):
+        self.bucket._request()
+
+class LocalBucket:
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _request(self):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    def blob(self, name):
+        return LocalBlob(self, name)
+
+    def list_blobs(self, prefix='', fields=None):
+        # Gercek API gibi tek istek (sayfalar dahil sayilmaz)
+        self._request()
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    yield LocalBlob(self, name)
+
+class LocalDocument:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+    def set(self, data, merge=False):
+        self.collection.db._request()
+        self.collection.db._write(self.collection.name, self.id, data, merge=merge)
+
+    def get(self):
+        self.collection.db._request()
+        return self.collection.db.data.get(self.collection.name, {}).get(self.id)
+
+class LocalSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data)
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+}
+
+class LocalQuery:
+    """order_by / where / limit / start_after / stream; stream() tek istek sayilir."""
+    def __init__(self, collection, orders=(), filters=(), limit_count=None, cursor=None):
+        self.collection = collection
+        self.orders = list(orders)
+        self.filters = list(filters)
+        self.limit_count = limit_count
+        self.cursor = cursor
+
+    def _copy(self, **changes):
+        fields = dict(orders=self.orders, filters=self.filters, limit_count=self.limit_count, cursor=self.cursor)
+        fields.update(changes)
+        return LocalQuery(self.collection, **fields)
+
+    def order_by(self, field):
+        return self._copy(orders=self.orders + [field])
+
+    def where(self, field, op, value):
+        return self._copy(filters=self.filters + [(field, op, value)])
+
+    def limit(self, count):
+        return self._copy(limit_count=count)
+
+    def start_after(self, snapshot):
+        return self._copy(cursor=snapshot)
+
+    def _key(self, doc_id, data):
+        return tuple(doc_id if field == '__name__' else data.get(field) for field in self.orders)
+
+    def stream(self):
+        self.collection.db._request()
+        with self.collection.db.lock:
+            docs = list(self.collection.db.data.get(self.collection.name, {}).items())
+        # Firestore gibi: siralanan alani olmayan belgeler sonuca girmez
+        docs = [(i, d) for i, d in docs if all(f == '__name__' or f in d for f in self.orders)]
+        docs = [(i, d) for i, d in docs if all(f in d and _OPERATORS[op](d[f], v) for f, op, v in self.filters)]
+        docs.sort(key=lambda item: self._key(*item))
+        if self.cursor is not None:
+            after = self._key(self.cursor.id, self.cursor.to_dict())
+            docs = [(i, d) for i, d in docs if self._key(i, d) > after]
+        if self.limit_count is not None:
+            docs = docs[:self.limit_count]
+        for doc_id, data in docs:
+            yield LocalSnapshot(doc_id, data)
+
+class LocalCollection(LocalQuery):
+    def __init__(self, db, name):
+        super().__init__(self)
+        self.db = db
+        self.name = name
+
+    def document(self, doc_id):
+        return LocalDocument(self, doc_id)
+
+class LocalBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, doc_ref, data, merge=False):
+        self.writes.append((doc_ref, data, merge))
+
+    def commit(self):
+        # Tek istekte butun yazmalar
+        self.db._request()
+        for doc_ref, data, merge in self.writes:
+            self.db._write(doc_ref.collection.name, doc_ref.id, data, merge=merge, save=False)
+        self.db._save()
+        self.writes = []
+
+# Tarih alanlari JSON'da {"__datetime__": iso} olarak saklanir, okunurken datetime'a doner
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    return str(value)
+
+def _decode(obj):
+    if set(obj) == {"__datetime__"}:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+class LocalFirestore:
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f, object_hook=_decode)
+
+    def _request(self):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    def get_all(self, doc_refs):
+        # Gercek API gibi tek istekte birden fazla belge
+        self._request()
+        with self.lock:
+            return [LocalSnapshot(ref.id, self.data.get(ref.collection.name, {}).get(ref.id)) for ref in doc_refs]
+
+    def _write(self, collection, doc_id, data, merge=False, save=True):
+        with self.lock:
+            docs = self.data.setdefault(collection, {})
+            if merge and doc_id in docs:
+                docs[doc_id].update(data)
+            else:
+                docs[doc_id] = dict(data)
+        if save:
+            self._save()
+
+    def _save(self):
+        with self.lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=1, default=_encode)
+            os.replace(tmp_path, self.path)
+
+    def collection(self, name):
+        return LocalCollection(self, name)
+
+    def batch(self):
+        return LocalBatch(self)
+
+def connect_local(directory, latency=0.0):
+    """Returns (bucket, db) backed by `directory`."""
+    bucket = LocalBucket(os.path.join(directory, "storage"), latency)
+    db = LocalFirestore(os.path.join(directory, "firestore.json"), latency)
+    return bucket, db
@@ -1,88 +1,296 @@
-import firebase_admin
-from firebase_admin import credentials, storage
-from google.cloud import firestore
 import os
+import json
+import base64
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- KONFIGURASYON ---
 # Service account dosyanizin tam yolunu buraya yazin
-SERVICE_ACCOUNT_PATH = 'serviceAccountKey.json' 
+SERVICE_ACCOUNT_PATH = 'serviceAccountKey.json'
 
 # Firebase Storage Bucket adiniz (gs:// olmadan)
 # Ornek: 'proje-id.appspot.com'
 BUCKET_NAME = 'fotografyarismasi-192c3.firebasestorage.app'
 
+# Firestore veritabani adi
+DATABASE_NAME = 'foto'
+
 # Fotograflarin bulundugu klasor
-SOURCE_FOLDER = '_JURI_OYLAMA_HAVUZU'   
+SOURCE_FOLDER = '_JURI_OYLAMA_HAVUZU'
+
+# Web icin kucultulmus turevlerin (thumb/grid/full) uretildigi klasor
+DERIVATIVE_FOLDER = '_JURI_OYLAMA_HAVUZU_WEB'
+
+# Tamamlanan yuklemelerin kaydi; tekrar calistirildiginda bunlar atlanir
+STATE_FILE = 'upload_state.json'
+
+# Ayni anda yapilan yukleme sayisi
+MAX_WORKERS = 16
+
+# Tek istekte yazilan Firestore belgesi sayisi (Firestore siniri 500)
+BATCH_SIZE = 400
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+STORAGE_PREFIX = 'photos/'
+
+def file_checksums(path):
+    """
+    Storage'in blob metadata'sindaki bicimde (base64) MD5 ve CRC32C.
+    CRC32C sadece google-crc32c paketi varsa hesaplanir, yoksa None.
+    """
+    md5 = hashlib.md5()
+    try:
+        import google_crc32c
+        crc = google_crc32c.Checksum()
+    except ImportError:
+        crc = None
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            md5.update(chunk)
+            if crc is not None:
+                crc.update(chunk)
+    return {
+        "md5": base64.b64encode(md5.digest()).decode('ascii'),
+        "crc32c": base64.b64encode(crc.digest()).decode('ascii') if crc is not None else None,
+    }
+
+def list_remote_checksums(bucket):
+    """{blob adi: (md5, crc32c)} - tek list_blobs cagrisiyla (sayfalama dahil)."""
+    blobs = bucket.list_blobs(prefix=STORAGE_PREFIX, fields='items(name,md5Hash,crc32c),nextPageToken')
+    return {blob.name: (blob.md5_hash, blob.crc32c) for blob in blobs}
+
+def same_content(local, remote):
+    md5, crc32c = remote
+    if md5:
+        return md5 == local["md5"]
+    # Composite nesnelerde MD5 yoktur; CRC32C ile karsilastir
+    return bool(crc32c) and crc32c == local["crc32c"]
+
+class UploadState:
+    """
+    Yukleme durumu.
+    blobs: {storage adi: {"size", "mtime_ns", "md5", "url"}} - yuklenen (ya da
+           bucket'ta ayni bulunan) her dosya; boyutu ya da degisiklik zamani degisen
+           dosya yeniden kontrol edilir.
+    docs:  {doc_id: {"urls": ...}} - Firestore'a yazilmis kayitlar ve URL'leri.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.blobs = {}
+        self.docs = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.blobs = data.get("blobs", {})
+                self.docs = data.get("docs", {})
+            except Exception as e:
+                print(f"UYARI: '{path}' okunamadi, bastan baslaniyor: {e}")
+
+    def is_current(self, name, local_path):
+        """Dosya kayittaki haliyle ayniysa True."""
+        st = os.stat(local_path)
+        entry = self.blobs.get(name)
+        return bool(entry) and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+
+    def mark_uploaded(self, name, local_path, url, md5=None):
+        st = os.stat(local_path)
+        with self.lock:
+            self.blobs[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "md5": md5, "url": url}
+
+    def mark_written(self, docs):
+        with self.lock:
+            for doc_id, urls in docs:
+                self.docs[doc_id] = {"urls": urls}
+
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"blobs": self.blobs, "docs": self.docs}, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+def connect_firebase():
+    """
+    (bucket_factory, db) dondurur. Her is parcacigi kendi Storage istemcisini
+    kullanir; boylece baglantilar is parcacigi icinde tekrar kullanilir.
+    """
+    from google.cloud import firestore, storage
 
-def upload_photos():
-    # 1. Firebase Baglantisi
     if not os.path.exists(SERVICE_ACCOUNT_PATH):
         print(f"HATA: '{SERVICE_ACCOUNT_PATH}' dosyasi bulunamadi!")
         print("Lutfen Firebase Service Account JSON dosyasini bu scriptin yanina koyun veya yolunu duzeltin.")
-        return
-
-    # Initialize Firebase Admin for Storage
-    cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
-    firebase_admin.initialize_app(cred, {
-        'storageBucket': BUCKET_NAME
-    })
+        return None, None
 
     # Initialize Firestore Client explicitly for the named database 'foto'
-    db = firestore.Client.from_service_account_json(SERVICE_ACCOUNT_PATH, database='foto')
-    bucket = storage.bucket()
+    db = firestore.Client.from_service_account_json(SERVICE_ACCOUNT_PATH, database=DATABASE_NAME)
+
+    local = threading.local()
+    def bucket_factory():
+        if not hasattr(local, 'bucket'):
+            local.bucket = storage.Client.from_service_account_json(SERVICE_ACCOUNT_PATH).bucket(BUCKET_NAME)
+        return local.bucket
+    return bucket_factory, db
+
+def connect_emulator(directory, latency=0.0):
+    """Firebase yerine yerel klasor (bkz. firebase_local)."""
+    from firebase_local import connect_local
+    bucket, db = connect_local(directory, latency)
+    return (lambda: bucket), db
+
+def _upload_file(bucket_factory, name, local_path):
+    blob = bucket_factory().blob(name)
+    # Herkese acik erisim yuklemeyle ayni istekte verilir (ayri make_public cagrisi yok)
+    blob.upload_from_filename(local_path, predefined_acl='publicRead')
+    return blob.public_url
+
+def _write_docs(db, docs, state):
+    """
+    (doc_id, urls) kayitlarini tek batch ile yazar. urls: {"url": orijinal,
+    "thumb"/"grid"/"full": turevler}. Firestore'da belgesi olmayan fotograflar
+    (yeni ya da belgeleri silinmis) sayaclar sifirdan yazilir; var olan
+    kayitlarda sadece URL'ler birlestirilir, mevcut oylar silinmez.
+    """
+    if not docs:
+        return 0
+    refs = [db.collection('photos').document(doc_id) for doc_id, _ in docs]
+    try:
+        # Hangi belgeler var: batch basina tek istek
+        existing = {snapshot.id for snapshot in db.get_all(refs) if snapshot.exists}
+    except Exception as e:
+        print(f"HATA: {len(docs)} Firestore kaydi okunamadi: {e}")
+        return 0
+    batch = db.batch()
+    for (doc_id, urls), doc_ref in zip(docs, refs):
+        data = {'id': doc_id, 'url': urls['url']}
+        derived = {size: url for size, url in urls.items() if size != 'url'}
+        if derived:
+            data['urls'] = derived
+        if doc_id not in existing:
+            data.update({'totalScore': 0, 'voteCount': 0})
+            batch.set(doc_ref, data)
+        else:
+            batch.set(doc_ref, data, merge=True)
+    try:
+        batch.commit()
+    except Exception as e:
+        print(f"HATA: {len(docs)} Firestore kaydi yazilamadi: {e}")
+        return 0
+    state.mark_written(docs)
+    state.save()
+    return len(docs)
+
+def upload_photos(source_folder=SOURCE_FOLDER, workers=MAX_WORKERS, state_path=STATE_FILE, emulator_dir=None, latency=0.0,
+                  derivative_folder=DERIVATIVE_FOLDER, derivative_format="webp"):
+    # 1. Firebase Baglantisi (ya da yerel emulator)
+    if emulator_dir:
+        bucket_factory, db = connect_emulator(emulator_dir, latency)
+    else:
+        bucket_factory, db = connect_firebase()
+    if db is None:
+        return
 
     # 2. Klasoru Tara
-    if not os.path.exists(SOURCE_FOLDER):
-        print(f"HATA: '{SOURCE_FOLDER}' klasoru bulunamadi!")
+    if not os.path.exists(source_folder):
+        print(f"HATA: '{source_folder}' klasoru bulunamadi!")
         return
 
-    files = [f for f in os.listdir(SOURCE_FOLDER) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))]
+    files = sorted(f for f in os.listdir(source_folder) if f.lower().endswith(IMAGE_EXTENSIONS))
     total_files = len(files)
-    print(f"Toplam {total_files} fotograf bulundu. Yukleme basliyor...")
+    print(f"Toplam {total_files} fotograf bulundu.")
 
-    uploaded_count = 0
+    # 3. Web turevleri (thumb/grid/full), tum cekirdeklerde; degismeyenler tekrar uretilmez
+    derived = {}
+    if derivative_folder:
+        from derivatives import build_all
+        print(f"Web turevleri uretiliyor ({derivative_format}) -> {derivative_folder}")
+        derived = build_all([os.path.join(source_folder, f) for f in files], derivative_folder, derivative_format)
 
+    # Dosya adi (uzantisiz) Firestore belge ID'si olarak kullanilir (orn: YARISMA_ID_001)
+    # Her fotograf icin yuklenecek dosyalar: orijinal + turevler
+    blobs = {} # storage adi -> yerel yol
+    photo_blobs = {} # doc_id -> {"url"/"thumb"/...: storage adi}
     for filename in files:
-        local_path = os.path.join(SOURCE_FOLDER, filename)
-        
-        # Dosya adini ID olarak kullan (uzanti olmadan veya kisa ID isterseniz parse edin)
-        # Istek: id: Dosya adı (örn: YARISMA_ID_001) -> tam dosya adini mi yoksa uzantisiz mi? 
-        # Genelde dosya adi unique ise direkt kullanilabilir. 
-        # "id: Dosya adı" dendiği için filename'i kullanıyoruz. 
-        # Ancak Firestore ID'lerinde '.' karakteri sorun cikarabilir mi? Hayir, document ID string olabilir.
-        # Yine de temiz gorunmesi icin uzantiyi atabiliriz ama talep "Dosya adı" oldugu icin filename kullanalim.
-        # Eger kullanici ID'yi "YARISMA_ID_001" gibi (uzantisiz) kastediyorsa, splitext yapalim.
-        # Ornekte "YARISMA_ID_001" verildigi icin uzantiyi atiyorum.
-        
-        doc_id = os.path.splitext(filename)[0] 
-        storage_path = f"photos/{filename}"
-        
-        try:
-            # 3. Storage Yukleme
-            blob = bucket.blob(storage_path)
-            blob.upload_from_filename(local_path)
-            
-            # Public URL alma
-            blob.make_public()
-            public_url = blob.public_url
-            
-            # 4. Firestore Kaydi
-            doc_ref = db.collection('photos').document(doc_id)
-            doc_ref.set({
-                'id': doc_id,
-                'url': public_url,
-                'totalScore': 0,
-                'voteCount': 0
-            })
-            
+        doc_id = os.path.splitext(filename)[0]
+        local_path = os.path.join(source_folder, filename)
+        names = {"url": STORAGE_PREFIX + filename}
+        blobs[names["url"]] = local_path
+        for size, path in derived.get(local_path, {}).items():
+            names[size] = f"{STORAGE_PREFIX}{size}/{os.path.basename(path)}"
+            blobs[names[size]] = path
+        photo_blobs[doc_id] = names
+
+    state = UploadState(state_path)
+    candidates = [name for name, path in blobs.items() if not state.is_current(name, path)]
+
+    # Kayitta olmayan dosyalar bucket'ta ayni icerikle zaten var olabilir (orn. durum dosyasi silindiyse).
+    # Yerel checksum'lar paralel hesaplanir, bucket tek seferde listelenir; sadece yeni/degisen dosyalar yuklenir.
+    to_upload = []
+    checksums = {}
+    remote = {}
+    if candidates:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            checksums = dict(zip(candidates, pool.map(file_checksums, (blobs[name] for name in candidates))))
+        remote = list_remote_checksums(bucket_factory())
+        for name in candidates:
+            if name in remote and same_content(checksums[name], remote[name]):
+                url = bucket_factory().blob(name).public_url
+                state.mark_uploaded(name, blobs[name], url, checksums[name]["md5"])
+            else:
+                to_upload.append(name)
+        state.save()
+    unchanged = len(candidates) - len(to_upload)
+    print(f"{len(blobs)} dosya: {len(blobs) - len(candidates)} zaten yuklu, {unchanged} bucket'ta ayni, {len(to_upload)} yuklenecek. Yukleme basliyor...")
+
+    # 4. Storage Yukleme (paralel)
+    uploaded_count = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_upload_file, bucket_factory, name, blobs[name]): name for name in to_upload}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                public_url = future.result()
+            except Exception as e:
+                print(f"HATA: {name} yuklenirken hata olustu: {e}")
+                continue
+            state.mark_uploaded(name, blobs[name], public_url, checksums[name]["md5"])
             uploaded_count += 1
-            print(f"[{uploaded_count}/{total_files}] Yuklendi: {filename} -> {public_url}")
+            print(f"[{uploaded_count}/{len(to_upload)}] Yuklendi: {name} -> {public_url}")
+            if uploaded_count % 50 == 0:
+                state.save()
+    state.save()
 
-        except Exception as e:
-            print(f"HATA: {filename} yuklenirken hata olustu: {e}")
+    # 5. Firestore Kayitlari: butun dosyalari yuklu olan ve URL'leri degisen fotograflar, BATCH_SIZE'lik gruplar halinde
+    to_write = []
+    for doc_id, names in photo_blobs.items():
+        if not all(name in state.blobs and state.is_current(name, blobs[name]) for name in names.values()):
+            continue
+        urls = {size: state.blobs[name]["url"] for size, name in names.items()}
+        if state.docs.get(doc_id, {}).get("urls") == urls:
+            continue
+        to_write.append((doc_id, urls))
+    written_count = 0
+    for start in range(0, len(to_write), BATCH_SIZE):
+        written_count += _write_docs(db, to_write[start:start + BATCH_SIZE], state)
 
     print("-" * 30)
-    print(f"Islem tamamlandi. {uploaded_count}/{total_files} fotograf basariyla yuklendi.")
+    print(f"Islem tamamlandi. {uploaded_count}/{len(to_upload)} dosya yuklendi, "
+          f"{written_count} Firestore kaydi yazildi.")
 
 if __name__ == "__main__":
-    upload_photos()
+    parser = argparse.ArgumentParser(description="Juri havuzundaki fotograflari Firebase Storage/Firestore'a yukler.")
+    parser.add_argument("--source", default=SOURCE_FOLDER, help="Fotograf klasoru")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Paralel yukleme sayisi")
+    parser.add_argument("--state-file", default=STATE_FILE, help="Tamamlanan yuklemelerin kaydi")
+    parser.add_argument("--derivatives", default=DERIVATIVE_FOLDER, help="Web turevlerinin klasoru")
+    parser.add_argument("--format", default="webp", choices=["webp", "avif"], help="Turev formati")
+    parser.add_argument("--no-derivatives", action="store_true", help="Sadece orijinalleri yukle")
+    parser.add_argument("--emulator", default=None, help="Firebase yerine bu klasordeki yerel emulatoru kullan")
+    parser.add_argument("--latency", type=float, default=0.0, help="Emulator istek gecikmesi (saniye)")
+    args = parser.parse_args()
+    upload_photos(args.source, args.workers, args.state_file, args.emulator, args.latency,
+                  None if args.no_derivatives else args.derivatives, args.format)
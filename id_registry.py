@@ -0,0 +1,119 @@
+import os
+import json
+import hashlib
+
+# Fotograf icerigi (SHA-256) -> kalici anonim ID numarasi.
+# Numara bir kez verilince degismez; os.listdir sirasi, yeni katilimcilar ya da
+# silinen fotograflar diger ID'leri kaydirmaz. Boylece Storage'daki dosyalar,
+# oylar ve indeks/onbellekler gecerli kalir.
+
+ID_PREFIX = "YARISMA_ID_"
+ID_WIDTH = 3
+
+HASH_CHUNK = 1 << 20
+
+def content_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class IdRegistry:
+    """
+    Kayit dosyasi (JSON):
+      ids:    {icerik ozeti: numara}
+      owners: {icerik ozeti: numarayi alan kaynak}  (ayni icerik iki kez gelirse ID asil sahibinde kalir)
+      hashes: {goreli kaynak yolu: [boyut, mtime_ns, ozet]}  (degismeyen dosya tekrar okunmaz)
+      next:   verilecek sonraki numara
+      width:  sifir dolgusu; kayit olusturulurken sabitlenir, isimler degismesin diye
+    """
+    def __init__(self, path, width=ID_WIDTH, prefix=ID_PREFIX):
+        self.path = path
+        self.prefix = prefix
+        self.ids = {}
+        self.owners = {}
+        self.hashes = {}
+        self.next = 1
+        self.width = width
+        self.exists = os.path.exists(path)
+        if self.exists:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.ids = data.get("ids", {})
+            self.owners = data.get("owners", {})
+            self.hashes = data.get("hashes", {})
+            self.next = data.get("next", 1 + max(self.ids.values(), default=0))
+            self.width = data.get("width", width)
+            if self.width != width:
+                print(f"Not: kayitli ID genisligi ({self.width}) kullaniliyor; degistirmek icin kaydi silip bastan numaralandirin.")
+
+    def cached_hash(self, key, path):
+        """Boyut ve mtime degismediyse kayitli ozet, yoksa None."""
+        st = os.stat(path)
+        entry = self.hashes.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def hash_file(self, key, path):
+        st = os.stat(path)
+        digest = content_hash(path)
+        self.hashes[key] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def lookup(self, digest):
+        return self.ids.get(digest)
+
+    def assign(self, digest, number, source):
+        """Var olan bir numarayi (eski eslesme listesinden) kayda gecirir."""
+        self.ids[digest] = number
+        self.owners[digest] = source
+        self.next = max(self.next, number + 1)
+
+    def allocate(self, digest, source):
+        number = self.ids.get(digest)
+        if number is None:
+            number = self.next
+            self.ids[digest] = number
+            self.next += 1
+        self.owners[digest] = source
+        return number
+
+    def allocate_all(self, items):
+        """
+        items: [(kaynak, icerik ozeti)], yeni numaralar bu sirayla verilir.
+        {kaynak: numara} dondurur. Kayitli icerik once asil sahibine, sahibi
+        yoksa (dosya tasinmis/yeniden adlandirilmis) ilk gelene verilir; ayni
+        icerigin diger kopyalari kendi anahtarlariyla ayri numara alir. Kendi
+        anahtariyla numara almis bir kopya, asil silinse de numarasini korur.
+        """
+        result, claimed, rest = {}, set(), []
+        for source, digest in items:
+            if digest in self.ids and self.owners.get(digest) == source:
+                result[source] = self.ids[digest]
+                claimed.add(digest)
+            else:
+                rest.append((source, digest))
+        for source, digest in rest:
+            own_key = f"{digest}:{source}"
+            key = digest if digest not in claimed and own_key not in self.ids else own_key
+            claimed.add(key)
+            result[source] = self.allocate(key, source)
+        return result
+
+    def name(self, number, ext=""):
+        return f"{self.prefix}{number:0{self.width}d}{ext}"
+
+    def forget_missing(self, keys):
+        """Artik bulunmayan kaynaklarin ozet onbellegini atar (ID'ler kalir, geri gelirse ayni ID)."""
+        keys = set(keys)
+        self.hashes = {k: v for k, v in self.hashes.items() if k in keys}
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"width": self.width, "next": self.next, "ids": self.ids, "owners": self.owners, "hashes": self.hashes},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.exists = True
@@ -0,0 +1,109 @@
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ExifTags
+
+# Gonderilen fotograflarin on kontrolu: sadece baslik ve EXIF okunur, pikseller
+# cozulmez. Bozuk/eksik/cok buyuk dosyalar kopyalama ve yuklemeden once elenir,
+# boyut, yon ve cekim zamani eslesme listesine yazilir.
+
+MAX_BYTES = 50 * 1024 * 1024
+# PIL'in "decompression bomb" siniri; daha buyukleri tarayici da zor acar
+MAX_PIXELS = Image.MAX_IMAGE_PIXELS
+
+# Uzantiya gore beklenen format
+FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG'}
+
+EXIF_IFD = 0x8769
+ORIENTATION = ExifTags.Base.Orientation
+DATETIME = ExifTags.Base.DateTime
+DATETIME_ORIGINAL = ExifTags.Base.DateTimeOriginal
+
+class InvalidImage(Exception):
+    pass
+
+def _jpeg_complete(path):
+    """JPEG dosyasi EOI isaretiyle (FFD9) bitiyor mu; yarim kopyalanmis dosyalari yakalar."""
+    with open(path, 'rb') as f:
+        f.seek(-32, os.SEEK_END)
+        # Bazi kameralar EOI'den sonra dolgu baytlari ekler
+        return b'\xff\xd9' in f.read()
+
+def _capture_time(exif):
+    value = exif.get_ifd(EXIF_IFD).get(DATETIME_ORIGINAL) or exif.get(DATETIME)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value).strip('\x00 '), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+def check_image(path, max_bytes=MAX_BYTES, max_pixels=MAX_PIXELS):
+    """
+    Fotografin basligini ve EXIF'ini okur. Gecerliyse metadata sozlugu
+    dondurur: width/height (yon uygulanmis, juriye gorunen), bytes, format,
+    orientation, captured_at. Gecersizse InvalidImage firlatir.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        raise InvalidImage("bos dosya")
+    if size > max_bytes:
+        raise InvalidImage(f"dosya cok buyuk ({size / 1024 / 1024:.0f} MB)")
+
+    expected = FORMATS.get(os.path.splitext(path)[1].lower())
+    try:
+        with Image.open(path) as img:
+            fmt = img.format
+            width, height = img.size
+            exif = img.getexif()
+            orientation = int(exif.get(ORIENTATION, 1) or 1)
+            captured_at = _capture_time(exif)
+        if expected and fmt != expected:
+            raise InvalidImage(f"uzanti {expected} ama dosya {fmt}")
+        if fmt == 'PNG':
+            # Parcalarin CRC'lerini kontrol eder, resmi cozmez (acildiktan hemen sonra cagrilmali)
+            with Image.open(path) as img:
+                img.verify()
+    except InvalidImage:
+        raise
+    except Exception as e:
+        raise InvalidImage(f"okunamadi ({e.__class__.__name__}: {e})")
+
+    if width * height > max_pixels:
+        raise InvalidImage(f"cok fazla piksel ({width}x{height})")
+    if fmt == 'JPEG' and not _jpeg_complete(path):
+        raise InvalidImage("dosya eksik (JPEG sonu yok)")
+
+    # 5-8: 90/270 derece; juri resmi dondurulmus gorur
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+    return {
+        "width": width,
+        "height": height,
+        "bytes": size,
+        "format": fmt,
+        "orientation": orientation,
+        "captured_at": captured_at,
+    }
+
+def _check(job):
+    path, max_bytes, max_pixels = job
+    try:
+        return path, check_image(path, max_bytes, max_pixels), None
+    except (InvalidImage, OSError) as e:
+        return path, None, str(e)
+
+def check_all(paths, workers=8, max_bytes=MAX_BYTES, max_pixels=MAX_PIXELS):
+    """
+    Fotograflari paralel kontrol eder (is disk okumasi, thread yeterli).
+    (metadata, hatalar) dondurur: {yol: metadata}, {yol: hata nedeni}.
+    """
+    metadata, errors = {}, {}
+    jobs = [(p, max_bytes, max_pixels) for p in paths]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for path, meta, error in pool.map(_check, jobs):
+            if meta is None:
+                errors[path] = error
+            else:
+                metadata[path] = meta
+    return metadata, errors
@@ -5,18 +5,26 @@ import threading
 import time
 import os
 import sys
-from group_similar_images_dl import get_image_paths, group_images, move_groups
+from group_similar_images_dl import scan_image_paths, update_groups
 
 # Configure appearance
 ctk.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
 ctk.set_default_color_theme("blue")  # Themes: "blue", "green", "dark-blue"
 
+# Map human readable to internal name
+MODEL_MAP = {
+    "ResNet50 (Fast)": "resnet50",
+    "ResNet152 (Accurate)": "resnet152",
+    "ViT-B/16 (Best for Patterns)": "vit_b_16",
+    "ViT-Large (Ultimate)": "vit_l_16"
+}
+
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
 
         self.title("AI Image Grouper - Deep Learning")
-        self.geometry("800x600")
+        self.geometry("800x700")
 
         # Grid configuration
         self.grid_columnconfigure(1, weight=1)
@@ -27,8 +35,12 @@ class App(ctk.CTk):
         self.target_path = tk.StringVar(value="/Volumes/KIOXIA/Aydın el sanatları ürün fotoğrafları/Ufak Boyut/Hedef")
         self.threshold = tk.DoubleVar(value=0.95)
         self.model_choice = tk.StringVar(value="ResNet50 (Fast)")
+        self.cache_path = tk.StringVar(value=os.path.join(os.path.expanduser("~"), ".cache", "image_grouper"))
         self.api_key = tk.StringVar()
         self.enable_ai = tk.BooleanVar(value=False)
+        self.incremental = tk.BooleanVar(value=False)
+        self.resume = tk.BooleanVar(value=False)
+        self.link_mode = tk.StringVar(value="copy")
         self.status_message = tk.StringVar(value="Ready")
         self.is_running = False
         
@@ -69,12 +81,42 @@ class App(ctk.CTk):
         self.label_model = ctk.CTkLabel(self, text="AI Model:")
         self.label_model.grid(row=4, column=0, padx=20, pady=10, sticky="w")
         
-        self.combo_model = ctk.CTkComboBox(self, variable=self.model_choice, values=["ResNet50 (Fast)", "ResNet152 (Accurate)", "ViT-B/16 (Best for Patterns)", "ViT-Large (Ultimate)"])
+        self.combo_model = ctk.CTkComboBox(self, variable=self.model_choice, values=list(MODEL_MAP), command=self.preload_model)
         self.combo_model.grid(row=4, column=1, padx=10, pady=10, sticky="ew")
         
+        # EMBEDDING CACHE
+        self.label_cache = ctk.CTkLabel(self, text="Cache Folder:")
+        self.label_cache.grid(row=5, column=0, padx=20, pady=10, sticky="w")
+        
+        self.entry_cache = ctk.CTkEntry(self, textvariable=self.cache_path, placeholder_text="Leave empty to disable embedding cache")
+        self.entry_cache.grid(row=5, column=1, padx=10, pady=10, sticky="ew")
+        
+        self.btn_cache = ctk.CTkButton(self, text="Browse", command=self.browse_cache, width=80)
+        self.btn_cache.grid(row=5, column=2, padx=20, pady=10)
+        
+        # OUTPUT MODE
+        self.label_output = ctk.CTkLabel(self, text="Output Mode:")
+        self.label_output.grid(row=6, column=0, padx=20, pady=(0, 10), sticky="w")
+        
+        self.combo_link = ctk.CTkComboBox(self, variable=self.link_mode, values=["copy", "hardlink", "reflink", "symlink"], width=150)
+        self.combo_link.grid(row=6, column=1, padx=10, pady=(0, 10), sticky="w")
+        
+        self.frame_options = ctk.CTkFrame(self, fg_color="transparent")
+        self.frame_options.grid(row=7, column=0, columnspan=3, padx=20, pady=(0, 10), sticky="w")
+        
+        self.check_incremental = ctk.CTkCheckBox(self.frame_options, text="Incremental (only add new photos)", variable=self.incremental)
+        self.check_incremental.pack(side="left", padx=(0, 10))
+        
+        self.check_resume = ctk.CTkCheckBox(self.frame_options, text="Resume interrupted run", variable=self.resume)
+        self.check_resume.pack(side="left", padx=10)
+        
+        # With a cache folder, embeddings are cached there and a rerun resumes on its own
+        self.cache_path.trace_add("write", lambda *_: self.update_resume_state())
+        self.update_resume_state()
+        
         # GEMINI AI SETTINGS
         self.frame_ai = ctk.CTkFrame(self)
-        self.frame_ai.grid(row=5, column=0, columnspan=3, padx=20, pady=10, sticky="ew")
+        self.frame_ai.grid(row=8, column=0, columnspan=3, padx=20, pady=10, sticky="ew")
         
         self.check_ai = ctk.CTkCheckBox(self.frame_ai, text="Enable AI Auto-Naming (Gemini)", variable=self.enable_ai)
         self.check_ai.pack(side="left", padx=10, pady=10)
@@ -84,23 +126,49 @@ class App(ctk.CTk):
 
         # START BUTTON
         self.btn_start = ctk.CTkButton(self, text="START PROCESSING", command=self.start_processing, height=40, font=ctk.CTkFont(weight="bold"))
-        self.btn_start.grid(row=6, column=0, columnspan=3, padx=20, pady=10)
+        self.btn_start.grid(row=9, column=0, columnspan=3, padx=20, pady=10)
 
         # CONSOLE / LOG
         self.textbox_log = ctk.CTkTextbox(self, width=760, height=150)
-        self.textbox_log.grid(row=7, column=0, columnspan=3, padx=20, pady=10, sticky="nsew")
+        self.textbox_log.grid(row=10, column=0, columnspan=3, padx=20, pady=10, sticky="nsew")
         
         # STATUS & PROGRESS
         self.progressbar = ctk.CTkProgressBar(self)
-        self.progressbar.grid(row=8, column=0, columnspan=3, padx=20, pady=(10, 0), sticky="ew")
+        self.progressbar.grid(row=11, column=0, columnspan=3, padx=20, pady=(10, 0), sticky="ew")
         self.progressbar.set(0)
         
         self.label_status = ctk.CTkLabel(self, textvariable=self.status_message, text_color="gray")
-        self.label_status.grid(row=9, column=0, columnspan=3, padx=20, pady=(0, 20), sticky="w")
+        self.label_status.grid(row=12, column=0, columnspan=3, padx=20, pady=(0, 20), sticky="w")
         
         self.label_time = ctk.CTkLabel(self, text="Elapsed: 00:00 | Remaining: --:--", text_color="gray")
-        self.label_time.grid(row=9, column=0, columnspan=3, padx=20, pady=(0, 20), sticky="e")
+        self.label_time.grid(row=12, column=0, columnspan=3, padx=20, pady=(0, 20), sticky="e")
+        
+        # Load the model in the background once the window is up
+        self.after(200, lambda: self.preload_model(self.model_choice.get()))
+        
+    def preload_model(self, model_human):
+        if self.is_running:
+            # Loading another model now could evict the one in use
+            return
+        model_name = MODEL_MAP.get(model_human, "resnet50")
+        
+        def work():
+            try:
+                from feature_extractor import preload
+                preload(model_name)
+            except Exception as e:
+                # Not fatal: the run loads the model itself
+                print(f"Model preload failed: {e}")
         
+        threading.Thread(target=work, daemon=True).start()
+
+    def update_resume_state(self):
+        if self.cache_path.get().strip():
+            self.resume.set(False)
+            self.check_resume.configure(state="disabled", text="Resume (automatic with cache)")
+        else:
+            self.check_resume.configure(state="normal", text="Resume interrupted run")
+
     def update_thresh_label(self, value):
         self.label_thresh.configure(text=f"Similarity ({value:.2f}):")
 
@@ -114,6 +182,11 @@ class App(ctk.CTk):
         if path:
             self.target_path.set(path)
 
+    def browse_cache(self):
+        path = filedialog.askdirectory()
+        if path:
+            self.cache_path.set(path)
+
     def log(self, message):
         self.textbox_log.insert("end", message + "\n")
         self.textbox_log.see("end")
@@ -128,15 +201,12 @@ class App(ctk.CTk):
         api_key = self.api_key.get()
         use_ai = self.enable_ai.get()
         model_human = self.model_choice.get()
+        cache_dir = self.cache_path.get().strip() or None
+        incremental = self.incremental.get()
+        resume = self.resume.get()
+        link_mode = self.link_mode.get()
         
-        # Map human readable to internal name
-        model_map = {
-            "ResNet50 (Fast)": "resnet50",
-            "ResNet152 (Accurate)": "resnet152",
-            "ViT-B/16 (Best for Patterns)": "vit_b_16",
-            "ViT-Large (Ultimate)": "vit_l_16"
-        }
-        model_name = model_map.get(model_human, "resnet50")
+        model_name = MODEL_MAP.get(model_human, "resnet50")
         
         if not source or not target:
             self.log("Error: Please select both source and target directories.")
@@ -156,7 +226,7 @@ class App(ctk.CTk):
         self.textbox_log.delete("0.0", "end") # Clear log
         
         # Start thread
-        thread = threading.Thread(target=self.run_logic, args=(source, target, thresh, use_ai, api_key, model_name))
+        thread = threading.Thread(target=self.run_logic, args=(source, target, thresh, use_ai, api_key, model_name, cache_dir, incremental, link_mode, resume))
         thread.start()
         
         # Start timer
@@ -184,40 +254,31 @@ class App(ctk.CTk):
         self.label_time.configure(text=f"Elapsed: {elapsed_str} | Remaining: {rem_str}")
         self.after(1000, self.update_timer)
 
-    def run_logic(self, source, target, threshold, use_ai, api_key, model_name):
+    def run_logic(self, source, target, threshold, use_ai, api_key, model_name, cache_dir=None, incremental=False, link_mode="copy", resume=False):
         try:
             self.log(f"Starting... Model: {model_name}")
             self.log(f"Source: {source}\nTarget: {target}\nThresh: {threshold:.2f}")
             
-            # 1. Find Images
+            # 1. Find Images (streamed; scanning overlaps with feature extraction)
             self.status_message.set("Scanning for images...")
-            images = get_image_paths(source)
-            self.log(f"Found {len(images)} images.")
+            images = scan_image_paths(source)
             
-            if not images:
-                self.log("No images found.")
-                self.finish_processing()
-                return
-            
-            # 2. Group Images with callback
+            # 2. Group Images with callback and copy them into the target
+            # (incremental runs only embed and copy photos not yet in the target's manifest)
             def progress_cb(current, total, msg):
                 ratio = current / total if total > 0 else 0
                 self.progressbar.set(ratio)
                 self.status_message.set(f"{msg} ({current}/{total})")
                 
-            groups = group_images(images, threshold, model_name=model_name, progress_callback=progress_cb)
-            self.log(f"Found {len(groups)} unique groups.")
+            groups = update_groups(images, target, threshold, model_name=model_name, progress_callback=progress_cb, num_workers=os.cpu_count() or 1, cache_dir=cache_dir, incremental=incremental, link_mode=link_mode, resume=resume)
             
-            # 3. Move Groups
-            self.log("Moving files...")
-            self.status_message.set("Moving files...")
+            if not groups:
+                self.log("No new images found.")
+                self.finish_processing()
+                return
             
-            def move_cb(current, total, msg):
-                ratio = current / total if total > 0 else 0
-                self.progressbar.set(ratio)
-                self.status_message.set(f"{msg} ({current}/{total})")
-
-            move_groups(groups, target, progress_callback=move_cb)
+            self.log(f"Grouped {sum(len(paths) for paths in groups.values())} images.")
+            self.log(f"Created or updated {len(groups)} groups.")
             
             # 4. AI Renaming
             if use_ai and api_key:
@@ -230,7 +291,8 @@ class App(ctk.CTk):
                     self.progressbar.set(ratio)
                     self.status_message.set(f"{msg} ({current}/{total})")
                     
-                rename_groups_with_gemini(groups, target, api_key, progress_callback=ai_cb)
+                name_cache = os.path.join(cache_dir, "gemini_names.json") if cache_dir else None
+                rename_groups_with_gemini(groups, target, api_key, progress_callback=ai_cb, cache_path=name_cache)
             
             self.log("Processing Complete!")
             self.status_message.set("Done.")
@@ -0,0 +1,77 @@
+import time
+import argparse
+import tempfile
+import numpy as np
+import torch
+import torch.nn as nn
+from torchvision import models
+from feature_extractor import FeatureExtractor
+from inference_backends import build_backend, BACKENDS
+from neighbors import normalize
+
+# Minimum cosine similarity to the eager float32 embedding of the same image
+FLOAT_TOLERANCE = 0.9999
+INT8_TOLERANCE = 0.99
+
+def load_eager(model_name, random_weights=False):
+    """The eager float32 feature model on CPU, and a version string for its artifacts."""
+    if not random_weights:
+        extractor = FeatureExtractor(model_name)
+        return extractor.model.cpu(), extractor.weights_version
+    # Same architecture without the download, for offline runs
+    model = getattr(models, model_name)(weights=None)
+    if model_name.startswith("vit"):
+        model.heads = nn.Identity()
+    else:
+        model = nn.Sequential(*list(model.children())[:-1])
+    return model.eval(), "random"
+
+def run(model, batches):
+    outputs = []
+    with torch.no_grad():
+        start = time.perf_counter()
+        for batch in batches:
+            outputs.append(model(batch).cpu().numpy().reshape(len(batch), -1))
+        elapsed = time.perf_counter() - start
+    return np.concatenate(outputs), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CPU inference backends against eager PyTorch.")
+    parser.add_argument("--models", nargs="+", default=["resnet50", "vit_b_16"])
+    parser.add_argument("--images", type=int, default=64, help="Synthetic images per run")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--artifact-dir", default=None, help="Export cache (default: a temporary directory)")
+    parser.add_argument("--random-weights", action="store_true", help="Skip the pretrained weight download")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    artifact_dir = args.artifact_dir or tempfile.mkdtemp(prefix="inference_artifacts_")
+    torch.manual_seed(0)
+    batches = list(torch.randn(args.images, 3, 224, 224).split(args.batch_size))
+    print(f"images={args.images} batch={args.batch_size} threads={torch.get_num_threads()}")
+
+    for model_name in args.models:
+        eager, version = load_eager(model_name, args.random_weights)
+        run(eager, batches[:1])  # warm-up
+        reference, eager_time = run(eager, batches)
+        reference = normalize(reference)
+        print(f"{model_name}: eager {args.images / eager_time:7.1f} img/s")
+
+        for backend in BACKENDS:
+            for quantize in (False, True):
+                if backend == "eager" and not quantize:
+                    continue
+                model = build_backend(eager, model_name, version, backend=backend, quantize=quantize, artifact_dir=artifact_dir)
+                run(model, batches[:1])
+                features, elapsed = run(model, batches)
+                similarity = float(np.min(np.sum(normalize(features) * reference, axis=1)))
+                tolerance = INT8_TOLERANCE if quantize else FLOAT_TOLERANCE
+                label = backend + ("+int8" if quantize else "")
+                status = "ok" if similarity >= tolerance else "OUT OF TOLERANCE"
+                print(f"{label:>18}: {args.images / elapsed:7.1f} img/s  "
+                      f"speedup={eager_time / elapsed:5.2f}x  min cos={similarity:.5f} (>= {tolerance}) {status}")
+
+if __name__ == "__main__":
+    main()
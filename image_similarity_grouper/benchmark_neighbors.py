@@ -0,0 +1,56 @@
+import time
+import argparse
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from neighbors import forward_neighbors
+
+def make_features(n, dim, clusters, noise, seed=0):
+    """Synthetic embeddings: `clusters` centres with gaussian jitter around them."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centres[labels] + rng.normal(scale=noise, size=(n, dim)).astype(np.float32)
+
+def legacy_pairs(features, threshold):
+    """The original path: dense float64 cosine_similarity matrix + Python scan."""
+    similarity_matrix = cosine_similarity(features)
+    pairs = set()
+    n = len(features)
+    for i in range(n):
+        for j in np.flatnonzero(similarity_matrix[i, i + 1:] >= threshold):
+            pairs.add((i, i + 1 + int(j)))
+    return pairs
+
+def to_pairs(neighbors):
+    return {(i, int(j)) for i, js in enumerate(neighbors) for j in js}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare neighbour-search backends against the dense cosine_similarity path.")
+    parser.add_argument("--n", type=int, default=5000, help="Number of embeddings")
+    parser.add_argument("--dim", type=int, default=2048, help="Embedding size (2048 = ResNet)")
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=0.15)
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the dense path (for N where it does not fit in memory)")
+    args = parser.parse_args()
+
+    features = make_features(args.n, args.dim, args.clusters, args.noise)
+    print(f"N={args.n} dim={args.dim} threshold={args.threshold}")
+
+    reference = None
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        reference = legacy_pairs(features, args.threshold)
+        print(f"{'legacy':>8}: {time.perf_counter() - start:8.2f}s  pairs={len(reference)}")
+
+    for backend in ["exact", "ivf"]:
+        start = time.perf_counter()
+        pairs = to_pairs(forward_neighbors(features, args.threshold, backend=backend))
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = pairs
+        recall = len(pairs & reference) / len(reference) if reference else 1.0
+        print(f"{backend:>8}: {elapsed:8.2f}s  pairs={len(pairs)}  recall={recall:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from PIL import Image
+from gemini_renamer import FakeModel, NameCache, suggest_names
+
+def make_images(directory, count, size):
+    rng = np.random.default_rng(0)
+    paths = {}
+    for i in range(count):
+        path = os.path.join(directory, f"group_{i:04d}.jpg")
+        Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8)).save(path, quality=90)
+        paths[f"group_{i:04d}"] = path
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput of the concurrent renamer against a fake Gemini model.")
+    parser.add_argument("--groups", type=int, default=40)
+    parser.add_argument("--size", type=int, default=2000, help="Side of the synthetic photos in pixels")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake request latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="Share of fake requests that fail and get retried")
+    parser.add_argument("--rpm", type=float, default=600, help="Rate limit in requests per minute")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images = make_images(tmp, args.groups, args.size)
+        print(f"groups={args.groups} latency={args.latency}s failures={args.failure_rate:.0%} limit={args.rpm}/min")
+        for concurrency in args.concurrency:
+            model = FakeModel(latency=args.latency, failure_rate=args.failure_rate)
+            start = time.perf_counter()
+            names = suggest_names(images, model, concurrency=concurrency, requests_per_minute=args.rpm)
+            elapsed = time.perf_counter() - start
+            print(f"concurrency={concurrency:>2}: {elapsed:6.2f}s  {len(names) / elapsed:6.2f} groups/s  "
+                  f"named={len(names)} requests={model.calls}")
+
+        cache = NameCache(os.path.join(tmp, "names.json"))
+        suggest_names(images, FakeModel(latency=args.latency), concurrency=max(args.concurrency), requests_per_minute=args.rpm, cache=cache)
+        model = FakeModel(latency=args.latency)
+        start = time.perf_counter()
+        names = suggest_names(images, model, concurrency=max(args.concurrency), requests_per_minute=args.rpm, cache=NameCache(cache.path))
+        print(f"cached rerun: {time.perf_counter() - start:6.2f}s  named={len(names)} requests={model.calls}")
+
+if __name__ == "__main__":
+    main()
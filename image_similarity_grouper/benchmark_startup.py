@@ -0,0 +1,44 @@
+import sys
+import argparse
+import subprocess
+import statistics
+
+# Modules the GUI used to pull in at import time
+HEAVY_MODULES = ["torch", "torchvision", "sklearn", "tqdm", "google.generativeai"]
+
+def time_import(module, extra=(), runs=3):
+    """Median cold import time of `module` (after `extra`) in fresh interpreters, and the heavy modules it loaded."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"for name in {list(extra)!r} + [{module!r}]:\n"
+        "    __import__(name)\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    times = []
+    loaded = ""
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.splitlines()
+        times.append(float(out[-2]))
+        loaded = out[-1]
+    return statistics.median(times), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import time of the grouper entry points.")
+    parser.add_argument("--modules", nargs="+", default=["group_similar_images_dl", "group_similar_images", "app_gui"])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            lazy, loaded = time_import(module, runs=args.runs)
+            # The old import graph loaded every heavy dependency up front
+            eager, _ = time_import(module, extra=HEAVY_MODULES, runs=args.runs)
+        except subprocess.CalledProcessError as e:
+            print(f"{module:>24}: import failed ({e.stderr.strip().splitlines()[-1]})")
+            continue
+        print(f"{module:>24}: {lazy:6.2f}s (with heavy imports: {eager:6.2f}s)  heavy loaded: {loaded or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import numpy as np
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with union by size and path halving."""
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        """Merges the sets of a and b; returns the new root."""
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+def _collect(uf, n):
+    """Groups 0..n-1 by root; each group sorted, groups ordered by their first index."""
+    groups = {}
+    for i in range(n):
+        groups.setdefault(uf.find(i), []).append(i)
+    return list(groups.values())
+
+def greedy_clusters(neighbors, similarities=None):
+    """
+    The original grouping: walk in order, each ungrouped i starts a group
+    and takes every later ungrouped neighbour. Depends on input order.
+    """
+    visited = set()
+    clusters = []
+    for i in range(len(neighbors)):
+        if i in visited:
+            continue
+        current = [i]
+        visited.add(i)
+        # neighbors[i] holds every j > i with similarity >= threshold, in order
+        for j in neighbors[i].tolist():
+            if j not in visited:
+                current.append(j)
+                visited.add(j)
+        clusters.append(current)
+    return clusters
+
+def connected_components(neighbors, similarities=None):
+    """Single linkage: any chain of similar pairs ends up in one group."""
+    n = len(neighbors)
+    uf = UnionFind(n)
+    for i, js in enumerate(neighbors):
+        for j in js.tolist():
+            uf.union(i, j)
+    return _collect(uf, n)
+
+def complete_linkage(neighbors, similarities):
+    """
+    Complete linkage: groups only merge if every cross pair is similar
+    enough. Pairs are merged from most to least similar (ties by index),
+    so the result does not depend on the order the pairs were found in.
+    """
+    n = len(neighbors)
+    rows = np.repeat(np.arange(n), [len(js) for js in neighbors])
+    cols = np.concatenate(neighbors) if n else np.empty(0, dtype=np.int64)
+    sims = np.concatenate(similarities) if n else np.empty(0, dtype=np.float32)
+    order = np.lexsort((cols, rows, -sims))
+
+    linked = [set(js.tolist()) for js in neighbors]
+    def is_linked(a, b):
+        return b in linked[a] if a < b else a in linked[b]
+
+    uf = UnionFind(n)
+    members = {i: [i] for i in range(n)}
+    for k in order.tolist():
+        a = uf.find(int(rows[k]))
+        b = uf.find(int(cols[k]))
+        if a == b:
+            continue
+        if all(is_linked(x, y) for x in members[a] for y in members[b]):
+            root = uf.union(a, b)
+            other = b if root == a else a
+            members[root].extend(members.pop(other))
+    return _collect(uf, n)
+
+CLUSTERING_METHODS = {
+    "greedy": greedy_clusters,
+    "components": connected_components,
+    "complete": complete_linkage,
+}
+
+def cluster(neighbors, similarities=None, method="greedy"):
+    """
+    Builds groups from forward neighbour lists (see neighbors.forward_neighbors).
+    Returns a list of index lists; the first index of each is its representative.
+    """
+    if method not in CLUSTERING_METHODS:
+        raise ValueError(f"Unknown clustering method: {method}. Choose from {', '.join(CLUSTERING_METHODS)}")
+    return CLUSTERING_METHODS[method](neighbors, similarities)
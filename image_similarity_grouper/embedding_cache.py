@@ -0,0 +1,158 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+INDEX_FILE = "index.json"
+VECTORS_FILE = "vectors.f32"
+
+def file_key(path, content_hash=False):
+    """
+    Builds the cache key for an image file.
+    Default key is (absolute path, size, mtime) which needs only a stat call.
+    With content_hash=True the file bytes are hashed instead, so renamed or
+    moved files still hit the cache.
+    """
+    if content_hash:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return f"sha1:{h.hexdigest()}"
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+class EmbeddingCache:
+    """
+    On-disk embedding store for one model.
+
+    Layout: <cache_dir>/<model_name>/index.json maps keys to row numbers and
+    vectors.f32 holds the raw float32 rows. Vectors are read back through a
+    memory map, so cached embeddings are never decoded or copied up front.
+    The store is wiped when the weights version or feature size changes, and
+    only the `max_models` most recently used model stores are kept.
+    """
+    def __init__(self, cache_dir, model_name, weights_version, content_hash=False, max_models=3):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.weights_version = weights_version
+        self.content_hash = content_hash
+        self.model_dir = os.path.join(cache_dir, model_name)
+        self.index_path = os.path.join(self.model_dir, INDEX_FILE)
+        self.vectors_path = os.path.join(self.model_dir, VECTORS_FILE)
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        self.entries = {}
+        self.dim = None
+        self.count = 0
+        self._load_index()
+        self._evict_other_models(max_models)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            self.invalidate()
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except Exception as e:
+            print(f"Embedding cache index unreadable, rebuilding: {e}")
+            self.invalidate()
+            return
+
+        if index.get("weights_version") != self.weights_version or index.get("content_hash") != self.content_hash:
+            print(f"Embedding cache for {self.model_name} is stale, clearing it.")
+            self.invalidate()
+            return
+
+        self.entries = index.get("entries", {})
+        self.dim = index.get("dim")
+        self.count = index.get("count", 0)
+
+        # A crash between appending vectors and saving the index leaves extra rows; ignore them
+        expected = self.count * (self.dim or 0) * 4
+        actual = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if actual < expected:
+            print("Embedding cache vectors truncated, clearing it.")
+            self.invalidate()
+
+    def _evict_other_models(self, max_models):
+        # Touch our own index so it counts as most recently used
+        if os.path.exists(self.index_path):
+            os.utime(self.index_path)
+        stores = []
+        for entry in os.scandir(self.cache_dir):
+            index_path = os.path.join(entry.path, INDEX_FILE)
+            if entry.is_dir() and entry.name != self.model_name and os.path.exists(index_path):
+                stores.append((os.path.getmtime(index_path), entry.path))
+        stores.sort(reverse=True)
+        for _, path in stores[max(max_models - 1, 0):]:
+            print(f"Evicting embedding cache: {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+    def invalidate(self):
+        """Drops every cached vector for this model."""
+        self.entries = {}
+        self.dim = None
+        self.count = 0
+        if os.path.exists(self.vectors_path):
+            os.remove(self.vectors_path)
+        self.save()
+
+    def save(self):
+        index = {
+            "model_name": self.model_name,
+            "weights_version": self.weights_version,
+            "content_hash": self.content_hash,
+            "dim": self.dim,
+            "count": self.count,
+            "entries": self.entries,
+        }
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def key_for(self, path):
+        try:
+            return file_key(path, self.content_hash)
+        except OSError:
+            return None
+
+    def lookup(self, keys):
+        """Returns the cached row number for each key, or None on a miss."""
+        return [self.entries.get(k) if k is not None else None for k in keys]
+
+    def vectors(self):
+        """Read-only memory map over all cached vectors, shape (count, dim)."""
+        if not self.count:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+
+    def add(self, keys, features):
+        """
+        Appends new vectors and returns their row numbers.
+        Call save() afterwards to persist the index.
+        """
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if not len(keys):
+            return []
+        if self.dim is None:
+            self.dim = features.shape[1]
+        elif features.shape[1] != self.dim:
+            print(f"Embedding size changed ({self.dim} -> {features.shape[1]}), clearing cache.")
+            self.invalidate()
+            self.dim = features.shape[1]
+
+        with open(self.vectors_path, 'ab') as f:
+            # Drop rows appended after the last saved index (e.g. an interrupted run)
+            f.truncate(self.count * self.dim * 4)
+            f.write(features.tobytes())
+
+        rows = list(range(self.count, self.count + len(keys)))
+        for key, row in zip(keys, rows):
+            if key is not None:
+                self.entries[key] = row
+        self.count += len(keys)
+        return rows
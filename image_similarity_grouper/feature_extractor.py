@@ -0,0 +1,232 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque, OrderedDict
+import torch
+import torch.nn as nn
+from torchvision import models
+from PIL import Image
+import numpy as np
+from inference_backends import build_backend
+
+def get_weights_version(model_name):
+    """Identifies the pretrained weights a model name resolves to, without loading them."""
+    weights = {
+        "resnet152": models.ResNet152_Weights.DEFAULT,
+        "vit_b_16": models.ViT_B_16_Weights.DEFAULT,
+        "vit_l_16": models.ViT_L_16_Weights.DEFAULT,
+    }.get(model_name, models.ResNet50_Weights.DEFAULT)
+    return str(weights)
+
+def embedding_version(model_name, quantize=False):
+    """Embedding cache version: int8 vectors differ from float ones, exported float models do not."""
+    return get_weights_version(model_name) + ("+int8" if quantize else "")
+
+class FeatureExtractor:
+    def __init__(self, model_name="resnet50", backend="eager", quantize=False, num_threads=None, artifact_dir=None):
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu")
+        if backend != "eager" or quantize:
+            # Exported and quantized models are CPU inference paths
+            self.device = torch.device("cpu")
+        print(f"Using device: {self.device}")
+        
+        print(f"Loading model: {model_name}...")
+        
+        if model_name == "resnet152":
+            weights = models.ResNet152_Weights.DEFAULT
+            self.model = models.resnet152(weights=weights)
+            # Remove classification layer
+            self.model = nn.Sequential(*list(self.model.children())[:-1])
+            self.preprocess = weights.transforms()
+            
+        elif model_name == "vit_b_16":
+            weights = models.ViT_B_16_Weights.DEFAULT
+            self.model = models.vit_b_16(weights=weights)
+            # Remove heads to get representation
+            self.model.heads = nn.Identity()
+            self.preprocess = weights.transforms()
+            
+        elif model_name == "vit_l_16":
+            weights = models.ViT_L_16_Weights.DEFAULT
+            self.model = models.vit_l_16(weights=weights)
+            # Remove heads to get representation
+            self.model.heads = nn.Identity()
+            self.preprocess = weights.transforms()
+            
+        else: # Default or resnet50
+            weights = models.ResNet50_Weights.DEFAULT
+            self.model = models.resnet50(weights=weights)
+            self.model = nn.Sequential(*list(self.model.children())[:-1])
+            self.preprocess = weights.transforms()
+            
+        self.model_name = model_name
+        self.weights_version = str(weights)
+        self.backend = backend
+        self._pool = None
+        self._pool_workers = 0
+        self.model.eval()
+        self.model = build_backend(
+            self.model, model_name, self.weights_version, backend=backend, quantize=quantize,
+            num_threads=num_threads, artifact_dir=artifact_dir, input_size=self.preprocess.crop_size[0]
+        )
+        self.model.to(self.device)
+
+    def extract(self, img_path):
+        try:
+            image = Image.open(img_path).convert('RGB')
+            input_tensor = self.preprocess(image)
+            input_batch = input_tensor.unsqueeze(0).to(self.device)
+            
+            with torch.no_grad():
+                features = self.model(input_batch)
+            
+            # ResNet returns (1, 2048, 1, 1), ViT returns (1, 768)
+            # Flatten ensures 1D array
+            return features.cpu().numpy().flatten()
+            
+        except Exception as e:
+            print(f"Error processing {img_path}: {e}")
+            return None
+
+    def _run_model(self, arrays):
+        input_batch = torch.from_numpy(np.stack(arrays)).to(self.device)
+        with torch.no_grad():
+            features = self.model(input_batch)
+        # Flatten everything except the batch dimension
+        return features.cpu().numpy().reshape(len(arrays), -1)
+
+    def worker_pool(self, num_workers):
+        """Decode worker pool, kept alive between runs so workers stay warm."""
+        if self._pool is None or self._pool_workers != num_workers:
+            self.close()
+            self._pool = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_preprocess_worker, initargs=(self.preprocess,))
+            self._pool_workers = num_workers
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def iter_batches(self, img_paths, batch_size=32, num_workers=0):
+        """
+        Streams (batch_paths, batch_features, consumed) tuples.
+        Decoding and preprocessing run in `num_workers` processes while the
+        model consumes batches of `batch_size`. `consumed` counts every input
+        path seen so far, including the ones that failed to load.
+        """
+        batch_paths = []
+        batch_arrays = []
+        consumed = 0
+        pool = self.worker_pool(num_workers) if num_workers > 0 else None
+        for path, array in iter_preprocessed(img_paths, self.preprocess, num_workers=num_workers, prefetch=batch_size * 2, pool=pool):
+            consumed += 1
+            if array is None:
+                continue
+            batch_paths.append(path)
+            batch_arrays.append(array)
+            if len(batch_arrays) >= batch_size:
+                yield batch_paths, self._run_model(batch_arrays), consumed
+                batch_paths = []
+                batch_arrays = []
+        if batch_arrays:
+            yield batch_paths, self._run_model(batch_arrays), consumed
+
+    def extract_batch(self, img_paths, batch_size=32, num_workers=0):
+        """
+        Extracts features for all paths. Returns (valid_paths, features_matrix);
+        images that fail to load are skipped.
+        """
+        valid_paths = []
+        features_list = []
+        for batch_paths, batch_features, _ in self.iter_batches(img_paths, batch_size, num_workers):
+            valid_paths.extend(batch_paths)
+            features_list.append(batch_features)
+        if not features_list:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return valid_paths, np.concatenate(features_list)
+
+# --- Parallel decode / preprocess workers ---
+# Module level so they can be pickled into worker processes.
+_worker_preprocess = None
+
+def _init_preprocess_worker(preprocess):
+    global _worker_preprocess
+    _worker_preprocess = preprocess
+    # Each worker only decodes; keep torch from oversubscribing the cores
+    torch.set_num_threads(1)
+
+def _load_and_preprocess(img_path, preprocess=None):
+    preprocess = preprocess or _worker_preprocess
+    try:
+        image = Image.open(img_path).convert('RGB')
+        return img_path, preprocess(image).numpy()
+    except Exception as e:
+        print(f"Error processing {img_path}: {e}")
+        return img_path, None
+
+def iter_preprocessed(img_paths, preprocess, num_workers=0, prefetch=64, pool=None):
+    """
+    Yields (path, preprocessed_array or None) in input order.
+    With num_workers > 0 a process pool decodes ahead of the consumer,
+    keeping at most `prefetch` images in flight. A pool passed in must have
+    been initialized with the same preprocess and is left running.
+    """
+    if num_workers <= 0:
+        for path in img_paths:
+            yield _load_and_preprocess(path, preprocess)
+        return
+
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_preprocess_worker, initargs=(preprocess,)) as pool:
+            yield from iter_preprocessed(img_paths, preprocess, num_workers, prefetch, pool)
+        return
+
+    pending = deque()
+    for path in img_paths:
+        pending.append(pool.submit(_load_and_preprocess, path))
+        if len(pending) >= max(prefetch, num_workers):
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# --- Process-wide model registry ---
+class ModelRegistry:
+    """
+    Loaded extractors keyed by (model_name, backend, quantize, num_threads), least
+    recently used first. Keeping max_models warm means repeated runs (and
+    switching back and forth between two models) in one process don't
+    reload weights or respawn decode workers.
+    """
+    def __init__(self, max_models=2):
+        self.max_models = max_models
+        self.extractors = OrderedDict()
+        # Held while loading, so a run started during a preload waits for it instead of loading twice
+        self.lock = threading.Lock()
+
+    def get(self, model_name="resnet50", backend="eager", quantize=False, num_threads=None):
+        key = (model_name, backend, quantize, num_threads)
+        with self.lock:
+            if key in self.extractors:
+                self.extractors.move_to_end(key)
+                return self.extractors[key]
+            while self.extractors and len(self.extractors) >= self.max_models:
+                _, evicted = self.extractors.popitem(last=False)
+                evicted.close()
+            extractor = FeatureExtractor(model_name=model_name, backend=backend, quantize=quantize, num_threads=num_threads)
+            self.extractors[key] = extractor
+            return extractor
+
+    def clear(self):
+        with self.lock:
+            for extractor in self.extractors.values():
+                extractor.close()
+            self.extractors.clear()
+
+registry = ModelRegistry()
+
+def get_extractor(model_name="resnet50", backend="eager", quantize=False, num_threads=None):
+    return registry.get(model_name, backend, quantize, num_threads)
+
+def preload(model_name="resnet50", backend="eager", quantize=False, num_threads=None):
+    """Loads a model into the registry ahead of time, e.g. from a background thread while the GUI is idle."""
+    registry.get(model_name, backend, quantize, num_threads)
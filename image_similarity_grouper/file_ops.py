@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import ctypes
+import ctypes.util
+from concurrent.futures import ThreadPoolExecutor
+
+LINK_MODES = ("copy", "hardlink", "reflink", "symlink")
+
+_fallback_warned = set()
+
+def _warn_fallback(link_mode, error):
+    if link_mode not in _fallback_warned:
+        _fallback_warned.add(link_mode)
+        print(f"{link_mode} not possible here ({error}); copying instead.")
+
+def _reflink(src, dest):
+    """Copy-on-write clone: clonefile() on macOS (APFS), FICLONE on Linux (Btrfs/XFS)."""
+    if sys.platform == "darwin":
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dest), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return
+
+    import fcntl
+    FICLONE = 0x40049409
+    try:
+        with open(src, 'rb') as s, open(dest, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        if os.path.exists(dest):
+            os.remove(dest)
+        raise
+    shutil.copystat(src, dest)
+
+def place_file(src, dest, link_mode="copy"):
+    """
+    Creates dest from src. Non-copy modes fall back to a plain copy when
+    the filesystem can't do them (e.g. hardlinks across volumes).
+    """
+    if link_mode == "hardlink":
+        try:
+            os.link(src, dest)
+            return
+        except OSError as e:
+            _warn_fallback(link_mode, e)
+    elif link_mode == "reflink":
+        try:
+            _reflink(src, dest)
+            return
+        except (OSError, AttributeError) as e:
+            _warn_fallback(link_mode, e)
+    elif link_mode == "symlink":
+        try:
+            os.symlink(os.path.abspath(src), dest)
+            return
+        except OSError as e:
+            _warn_fallback(link_mode, e)
+    shutil.copy2(src, dest)
+
+def place_files(jobs, link_mode="copy", workers=8, progress_callback=None):
+    """
+    Runs place_file for every (src, dest) pair, concurrently on a thread
+    pool since the work is I/O bound. Returns dest (or None on failure)
+    for each job, in order.
+    """
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {link_mode}. Choose from {', '.join(LINK_MODES)}")
+
+    def run(job):
+        src, dest = job
+        try:
+            place_file(src, dest, link_mode)
+            return dest
+        except Exception as e:
+            print(f"Failed to copy {src} to {dest}: {e}")
+            return None
+
+    total = len(jobs)
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for done, result in enumerate(pool.map(run, jobs), start=1):
+            results.append(result)
+            if progress_callback:
+                progress_callback(done, total, f"Placed {os.path.basename(jobs[done - 1][1])}")
+    return results
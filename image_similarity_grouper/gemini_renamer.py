@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image, ImageOps
+
+PROMPT = (
+    "Sana gönderdiğim görseldeki ürünü analiz et; türünü, ana rengini ve belirgin desenini tespit et. "
+    "Bunu bilgisayar dosya sistemi için uygun, Türkçe karakter ve boşluk içermeyen, "
+    "kelimelerin arasına tire (-) koyduğun, maksimum 4-5 kelimelik kısa ve net bir dosya ismine dönüştür. "
+    "Cevap olarak sadece ürettiğin dosya ismini yaz, başka açıklama yapma."
+)
+
+VALID_CHARS = "-_.() abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+def clean_name(text):
+    """Keeps only filesystem-safe characters; spaces become dashes."""
+    return "".join(c for c in text.strip() if c in VALID_CHARS).replace(" ", "-")
+
+def image_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def make_thumbnail(path, max_size=768):
+    """
+    Downscaled RGB copy for upload. Gemini works on 768px tiles, so sending
+    the full-resolution photo only costs bandwidth. JPEGs are decoded at
+    reduced scale directly.
+    """
+    with Image.open(path) as img:
+        img.draft('RGB', (max_size, max_size))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+    img.thumbnail((max_size, max_size))
+    return img
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class NameCache:
+    """Name suggestions keyed by model and image hash, persisted as JSON."""
+    def __init__(self, path):
+        self.path = path
+        self.names = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.names = json.load(f)
+            except Exception as e:
+                print(f"Ignoring unreadable name cache {path}: {e}")
+
+    def get(self, key):
+        with self.lock:
+            return self.names.get(key)
+
+    def set(self, key, name):
+        with self.lock:
+            self.names[key] = name
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.names, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+class GeminiModel:
+    def __init__(self, api_key, model_name='gemini-flash-latest'):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def suggest(self, image):
+        return self.model.generate_content([PROMPT, image]).text
+
+class FakeModel:
+    """
+    Offline stand-in for GeminiModel: answers after `latency` seconds with a
+    name derived from the image, and fails with `failure_rate` probability
+    like a rate-limited API would.
+    """
+    def __init__(self, latency=0.5, failure_rate=0.0, seed=0):
+        self.name = "fake"
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def suggest(self, image):
+        with self.lock:
+            self.calls += 1
+            fail = self.random.random() < self.failure_rate
+        time.sleep(self.latency)
+        if fail:
+            raise RuntimeError("429 Resource exhausted (fake)")
+        r, g, b = image.resize((1, 1)).getpixel((0, 0))
+        return f"urun-{image.width}x{image.height}-{r:02x}{g:02x}{b:02x}"
+
+def _with_retries(call, retries=4, base_delay=1.0):
+    """Retries with exponential backoff and jitter. ValueError (e.g. a blocked response) is not retried."""
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except ValueError:
+            raise
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = base_delay * (2 ** attempt) * (0.5 + random.random())
+            print(f"Gemini request failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def suggest_names(images, model, concurrency=4, requests_per_minute=60, cache=None, retries=4, thumbnail_size=768, progress_callback=None):
+    """
+    Asks the model for a folder name for each image.
+    images maps a key (e.g. group id) to an image path. Requests run on
+    `concurrency` threads, never faster than requests_per_minute; cached
+    suggestions skip the request entirely. Returns {key: cleaned name}; keys
+    whose request failed are left out.
+    """
+    bucket = TokenBucket(requests_per_minute / 60.0, capacity=max(1, concurrency))
+    cache = cache or NameCache(None)
+
+    def work(path):
+        cache_key = f"{model.name}:{image_hash(path)}"
+        name = cache.get(cache_key)
+        if name is None:
+            thumbnail = make_thumbnail(path, thumbnail_size)
+
+            def call():
+                bucket.acquire()
+                return model.suggest(thumbnail)
+
+            name = clean_name(_with_retries(call, retries))
+            if name:
+                cache.set(cache_key, name)
+        return name
+
+    names = {}
+    total = len(images)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(work, path): key for key, path in images.items()}
+        for done, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            try:
+                name = future.result()
+                if name:
+                    names[key] = name
+            except Exception as e:
+                print(f"Error naming group {key}: {e}")
+            if progress_callback:
+                progress_callback(done, total, f"AI named group {key}")
+    cache.save()
+    return names
@@ -1,23 +1,120 @@
 import os
-import shutil
+import time
 import imagehash
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+from hamming_index import HammingIndex, hash_to_int
+from pipeline import iter_image_paths
+from manifest import GroupManifest
+from file_ops import place_files, LINK_MODES
 
 def find_images(source_dir):
     """
     Recursively scans for image files in the source directory.
     """
     image_extensions = {'.jpg', '.jpeg', '.png'}
-    images = []
-    for root, dirs, files in os.walk(source_dir):
-        for file in files:
-            if os.path.splitext(file)[1].lower() in image_extensions:
-                images.append(os.path.join(root, file))
-    return images
+    return list(iter_image_paths(source_dir, image_extensions))
 
-def group_images(image_paths, threshold=5):
+HASH_FUNCTIONS = {
+    'phash': imagehash.phash,
+    'dhash': imagehash.dhash,
+    'whash': imagehash.whash,
+    'average': imagehash.average_hash,
+}
+
+def _hash_file(img_path, algorithms, fast_decode):
+    """
+    Decodes one image once and computes every requested hash on it.
+    Returns (path, {algorithm: hash} or None, decode_seconds, hash_seconds).
+    """
+    try:
+        start = time.perf_counter()
+        with Image.open(img_path) as img:
+            if fast_decode and img.format == 'JPEG':
+                # Let libjpeg decode at up to 1/8 scale; the hashes only need ~32x32 pixels
+                img.draft('L', (64, 64))
+            gray = img.convert('L')
+        decoded = time.perf_counter()
+        hashes = {name: HASH_FUNCTIONS[name](gray) for name in algorithms}
+        return img_path, hashes, decoded - start, time.perf_counter() - decoded
+    except Exception as e:
+        print(f"Error processing {img_path}: {e}")
+        return img_path, None, 0.0, 0.0
+
+def _hash_file_star(args):
+    return _hash_file(*args)
+
+def compute_hashes(image_paths, algorithms=('phash',), workers=None, fast_decode=False):
+    """
+    Hashes images across a process pool, decoding each file only once for
+    all `algorithms`. Returns ({path: {algorithm: hash}}, timings) where
+    timings holds summed decode/hash CPU seconds and the stage wall time.
+    Paths keep their input order; unreadable files are left out.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    tasks = [(path, tuple(algorithms), fast_decode) for path in image_paths]
+    timings = {'decode': 0.0, 'hash': 0.0}
+    hashes = {}
+
+    start = time.perf_counter()
+    if workers <= 1:
+        results = map(_hash_file_star, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_hash_file_star, tasks, chunksize=max(1, min(64, len(tasks) // (workers * 4))))
+    try:
+        for img_path, result, decode_s, hash_s in results:
+            timings['decode'] += decode_s
+            timings['hash'] += hash_s
+            if result is not None:
+                hashes[img_path] = result
+    finally:
+        if pool:
+            pool.shutdown()
+    timings['wall'] = time.perf_counter() - start
+    return hashes, timings
+
+class _RepresentativeHash(imagehash.ImageHash):
     """
-    Groups images based on pHash similarity.
+    ImageHash keyed by its full 64-bit value. ImageHash.__hash__ only spans
+    a few thousand values, which makes a dict with many groups collide badly.
+    """
+    def __init__(self, image_hash, value):
+        super().__init__(image_hash.hash)
+        self.value = value
+
+    def __hash__(self):
+        return self.value
+
+def _assign_to_groups(hashes, index, owners):
+    """
+    Greedy assignment of {path: hash} in order. index holds the
+    representatives so far; owners[i] is the existing group id (str) of
+    index position i. Returns (grown, new_groups): new paths per existing
+    group id, and {representative hash: paths} for groups started here.
+    """
+    grown = {}
+    new_groups = {} # Key: specific hash object (representative), Value: list of paths
+    
+    for img_path, h in hashes.items():
+        value = hash_to_int(h)
+        position = index.first_within(value)
+        if position < 0:
+            index.add(value)
+            rep = _RepresentativeHash(h, value)
+            owners.append(rep)
+            new_groups[rep] = [img_path]
+        elif isinstance(owners[position], str):
+            grown.setdefault(owners[position], []).append(img_path)
+        else:
+            new_groups[owners[position]].append(img_path)
+            
+    return grown, new_groups
+
+def group_images(image_paths, threshold=5, algorithm='phash', workers=None, fast_decode=False):
+    """
+    Groups images based on perceptual hash similarity (pHash by default).
     Returns a dictionary where keys are the hash of the first image in the group,
     and values are lists of image paths in that group.
     """
@@ -31,49 +128,65 @@ def group_images(image_paths, threshold=5):
     # Let's use a list of groups, where each group has a representative hash.
     # groups structure: { representative_hash: [list_of_image_paths] }
     
-    hashes = {} # Cache hashes
-    
     total = len(image_paths)
-    print(f"Hashing {total} images...")
+    print(f"Hashing {total} images ({algorithm})...")
     
-    for i, img_path in enumerate(image_paths):
-        try:
-            with Image.open(img_path) as img:
-                h = imagehash.phash(img)
-                hashes[img_path] = h
-        except Exception as e:
-            print(f"Error processing {img_path}: {e}")
-            continue
+    all_hashes, timings = compute_hashes(image_paths, algorithms=(algorithm,), workers=workers, fast_decode=fast_decode)
+    hashes = {path: result[algorithm] for path, result in all_hashes.items()} # Cache hashes
             
     print("Grouping images...")
+    group_start = time.perf_counter()
     
-    grouped_images = {} # Key: specific hash object (representative), Value: list of paths
-    
-    # Simple naive grouping: pairwise comparison with existing groups
-    # O(N*G) where N is images, G is number of groups.
+    # Greedy assignment: each image joins the first (oldest) group whose
+    # representative is closer than threshold. Representatives are kept in a
+    # Hamming index so this is not a Python loop over every group.
+    _, grouped_images = _assign_to_groups(hashes, HammingIndex(max_distance=threshold - 1), [])
     
-    for img_path, h in hashes.items():
-        found_group = False
-        for group_hash in grouped_images:
-            if h - group_hash < threshold:
-                grouped_images[group_hash].append(img_path)
-                found_group = True
-                break
-        
-        if not found_group:
-            grouped_images[h] = [img_path]
+    print(f"Timings: decode {timings['decode']:.2f}s, hash {timings['hash']:.2f}s (CPU, all workers), "
+          f"hashing stage {timings['wall']:.2f}s, grouping {time.perf_counter() - group_start:.2f}s")
             
     return grouped_images
 
-def move_groups(groups, target_dir):
+def _plan_group_files(paths, group_path, count, planned):
+    """Picks a destination in group_path for each path; returns [(source, destination)]."""
+    jobs = []
+    for img_path in paths:
+        filename = os.path.basename(img_path)
+        # Handle potential duplicate filenames if coming from different subdirs
+        dest_path = os.path.join(group_path, filename)
+        
+        # If file exists, append a suffix (counting up until the name is free)
+        base, ext = os.path.splitext(filename)
+        suffix = count
+        while os.path.exists(dest_path) or dest_path in planned:
+            dest_path = os.path.join(group_path, f"{base}_{suffix}{ext}")
+            suffix += 1
+        
+        planned.add(dest_path)
+        jobs.append((img_path, dest_path))
+    return jobs
+
+def _place_grouped(jobs, placements, link_mode, workers):
+    """Runs (source, destination, group key) jobs and records placed files in placements."""
+    results = place_files([(src, dest) for src, dest, _ in jobs], link_mode=link_mode, workers=workers)
+    for (_, _, key), dest_path in zip(jobs, results):
+        if dest_path:
+            placements[key]["files"].append(dest_path)
+
+def move_groups(groups, target_dir, link_mode="copy", workers=8):
     """
     Moves groups of images to the target directory.
-    Only moves groups with more than 1 image.
+    Only moves groups with more than 1 image. Files are copied (or linked,
+    see file_ops.LINK_MODES) concurrently once every destination is known.
+    Returns {hash: {"folder": group folder or None, "files": [placed paths]}}.
     """
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
         
     count = 0
+    planned = set()
+    jobs = []
+    placements = {}
     for h, paths in groups.items():
         if len(paths) > 1:
             group_name = f"Grup_{str(h)}"
@@ -83,23 +196,78 @@ def move_groups(groups, target_dir):
                 os.makedirs(group_path)
             
             print(f"Processing group {group_name} with {len(paths)} images...")
-            for img_path in paths:
-                filename = os.path.basename(img_path)
-                # Handle potential duplicate filenames if coming from different subdirs
-                dest_path = os.path.join(group_path, filename)
-                
-                # If file exists, append a suffix
-                if os.path.exists(dest_path):
-                    base, ext = os.path.splitext(filename)
-                    dest_path = os.path.join(group_path, f"{base}_{count}{ext}")
-                
-                try:
-                    shutil.copy2(img_path, dest_path)
-                except Exception as e:
-                    print(f"Failed to copy {img_path} to {dest_path}: {e}")
+            jobs.extend((src, dest, h) for src, dest in _plan_group_files(paths, group_path, count, planned))
+            placements[h] = {"folder": group_path, "files": []}
             count += 1
+        else:
+            placements[h] = {"folder": None, "files": []}
             
+    _place_grouped(jobs, placements, link_mode, workers)
     print(f"Created {count} groups in {target_dir}")
+    return placements
+
+def update_groups(image_paths, target_dir, threshold=5, algorithm='phash', workers=None, fast_decode=False, incremental=True, link_mode="copy"):
+    """
+    Groups images into target_dir and records the result in its manifest.
+    With incremental=True, images already in the manifest are skipped and
+    new ones are assigned against the stored group representatives first,
+    so only new files are hashed and copied. Without a manifest for the
+    same settings (or with incremental=False) this is a full run.
+    Returns {group id: all member paths} for groups created or grown.
+    """
+    settings = {"grouper": "hash", "algorithm": algorithm, "threshold": threshold, "fast_decode": fast_decode}
+    manifest = GroupManifest.load(target_dir) if incremental else None
+    if manifest is None or manifest.settings != settings:
+        if manifest is not None:
+            print("Existing manifest was built with different settings; regrouping everything.")
+        manifest = GroupManifest(target_dir, settings)
+
+    known = manifest.known_paths()
+    new_paths = [p for p in image_paths if os.path.abspath(p) not in known]
+    print(f"Hashing {len(new_paths)} new images ({algorithm}), {len(known)} already grouped...")
+    all_hashes, timings = compute_hashes(new_paths, algorithms=(algorithm,), workers=workers, fast_decode=fast_decode)
+    hashes = {path: result[algorithm] for path, result in all_hashes.items()}
+    print(f"Timings: decode {timings['decode']:.2f}s, hash {timings['hash']:.2f}s (CPU, all workers), hashing stage {timings['wall']:.2f}s")
+
+    index = HammingIndex(max_distance=threshold - 1)
+    owners = []
+    for group_id, entry in manifest.groups.items():
+        index.add(int(entry["hash"], 16))
+        owners.append(group_id)
+    grown, new_groups = _assign_to_groups(hashes, index, owners)
+
+    changed = {}
+    planned = set()
+    jobs = []
+    grown_placements = {}
+    for group_id, paths in grown.items():
+        entry = manifest.groups[group_id]
+        members = entry["members"] + paths
+        files = [manifest.absolute(f) for f in entry["files"]]
+        if entry["folder"]:
+            folder = manifest.absolute(entry["folder"])
+            to_copy = paths
+        else:
+            # Singletons are never copied; the group gets its folder now that it has company
+            folder = os.path.join(target_dir, f"Grup_{entry['hash']}")
+            os.makedirs(folder, exist_ok=True)
+            to_copy = members
+        jobs.extend((src, dest, group_id) for src, dest in _plan_group_files(to_copy, folder, len(manifest.groups), planned))
+        grown_placements[group_id] = {"folder": folder, "files": files}
+        changed[group_id] = members
+    _place_grouped(jobs, grown_placements, link_mode, workers=8)
+    for group_id, placement in grown_placements.items():
+        manifest.set_group(group_id, changed[group_id], placement["folder"], placement["files"], hash=manifest.groups[group_id]["hash"])
+
+    placements = move_groups(new_groups, target_dir, link_mode=link_mode)
+    for h, paths in new_groups.items():
+        group_id = manifest.unique_id(str(h))
+        manifest.set_group(group_id, paths, placements[h]["folder"], placements[h]["files"], hash=str(h))
+        changed[group_id] = paths
+
+    manifest.save()
+    print(f"{len(grown)} groups grew, {len(new_groups)} new groups.")
+    return changed
 
 import argparse
 
@@ -108,6 +276,11 @@ def main():
     parser.add_argument("--source", required=True, help="Source directory containing images")
     parser.add_argument("--target", required=True, help="Target directory for grouped images")
     parser.add_argument("--threshold", type=int, default=15, help="Similarity threshold (default: 15)")
+    parser.add_argument("--hash", default="phash", choices=list(HASH_FUNCTIONS), help="Hash algorithm (default: phash)")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: all cores)")
+    parser.add_argument("--fast-decode", action="store_true", help="Decode JPEGs at up to 1/8 scale (faster, but hashes can differ slightly from a full decode)")
+    parser.add_argument("--incremental", action="store_true", help="Only add images not yet in the target's manifest to existing groups")
+    parser.add_argument("--link-mode", default="copy", choices=list(LINK_MODES), help="How files are placed in the target (falls back to copy across filesystems)")
     
     args = parser.parse_args()
     
@@ -129,8 +302,7 @@ def main():
         print("No images found in source folder.")
         return
 
-    groups = group_images(images, THRESHOLD)
-    move_groups(groups, TARGET_DIR)
+    update_groups(images, TARGET_DIR, THRESHOLD, algorithm=args.hash, workers=args.workers, fast_decode=args.fast_decode, incremental=args.incremental, link_mode=args.link_mode)
     print("Done.")
 
 if __name__ == "__main__":
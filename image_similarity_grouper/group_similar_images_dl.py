@@ -1,176 +1,214 @@
 import os
+import time
 import shutil
 import argparse
-import torch
-import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
-from sklearn.metrics.pairwise import cosine_similarity
+import itertools
 import numpy as np
-from tqdm import tqdm
+from embedding_cache import EmbeddingCache
+from neighbors import forward_neighbors, normalize
+from manifest import GroupManifest, CHECKPOINT_DIR
+from file_ops import place_files, LINK_MODES
+from clustering import cluster, CLUSTERING_METHODS
+from pipeline import iter_image_paths, prefetch, GrowableMatrix
 
-def get_image_paths(source_dir):
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff'}
-    paths = []
-    for root, dirs, files in os.walk(source_dir):
-        for file in files:
-            if os.path.splitext(file)[1].lower() in image_extensions:
-                paths.append(os.path.join(root, file))
-    return paths
-
-class FeatureExtractor:
-    def __init__(self, model_name="resnet50"):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu")
-        print(f"Using device: {self.device}")
-        
-        print(f"Loading model: {model_name}...")
-        
-        if model_name == "resnet152":
-            weights = models.ResNet152_Weights.DEFAULT
-            self.model = models.resnet152(weights=weights)
-            # Remove classification layer
-            self.model = nn.Sequential(*list(self.model.children())[:-1])
-            self.preprocess = weights.transforms()
-            
-        elif model_name == "vit_b_16":
-            weights = models.ViT_B_16_Weights.DEFAULT
-            self.model = models.vit_b_16(weights=weights)
-            # Remove heads to get representation
-            self.model.heads = nn.Identity()
-            self.preprocess = weights.transforms()
-            
-        elif model_name == "vit_l_16":
-            weights = models.ViT_L_16_Weights.DEFAULT
-            self.model = models.vit_l_16(weights=weights)
-            # Remove heads to get representation
-            self.model.heads = nn.Identity()
-            self.preprocess = weights.transforms()
-            
-        else: # Default or resnet50
-            weights = models.ResNet50_Weights.DEFAULT
-            self.model = models.resnet50(weights=weights)
-            self.model = nn.Sequential(*list(self.model.children())[:-1])
-            self.preprocess = weights.transforms()
-            
-        self.model.eval()
-        self.model.to(self.device)
+# torch/torchvision (feature_extractor) and google.generativeai take seconds to
+# import, so they are only imported where they are used.
 
-    def extract(self, img_path):
-        try:
-            image = Image.open(img_path).convert('RGB')
-            input_tensor = self.preprocess(image)
-            input_batch = input_tensor.unsqueeze(0).to(self.device)
-            
-            with torch.no_grad():
-                features = self.model(input_batch)
-            
-            # ResNet returns (1, 2048, 1, 1), ViT returns (1, 768)
-            # Flatten ensures 1D array
-            return features.cpu().numpy().flatten()
-            
-        except Exception as e:
-            print(f"Error processing {img_path}: {e}")
-            return None
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff'}
 
-def group_images(image_paths, threshold=0.95, model_name="resnet50", progress_callback=None):
-    extractor = FeatureExtractor(model_name=model_name)
-    
-    features_list = []
-    valid_paths = []
-    
-    total_images = len(image_paths)
+def scan_image_paths(source_dir, queue_size=1024):
+    """Streams image paths from a background scan, at most queue_size ahead of the consumer."""
+    return prefetch(iter_image_paths(source_dir, IMAGE_EXTENSIONS), maxsize=queue_size)
+
+def get_image_paths(source_dir):
+    return list(iter_image_paths(source_dir, IMAGE_EXTENSIONS))
+
+def extract_features(image_paths, model_name="resnet50", progress_callback=None, batch_size=32, num_workers=0, cache_dir=None, backend="eager", quantize=False, checkpoint_interval=60, num_threads=None):
+    """
+    Returns (valid_paths, features_matrix) in input order.
+    image_paths may be a list or a lazy iterator such as scan_image_paths();
+    with an iterator, images are embedded while the scan is still running
+    and progress totals grow as paths arrive.
+    With cache_dir set, embeddings from earlier runs are read from the
+    on-disk cache and only missing images go through the model. The cache
+    index is saved every checkpoint_interval seconds, so an interrupted run
+    loses at most that much work.
+    """
+    from feature_extractor import get_extractor, embedding_version
+    total_known = len(image_paths) if hasattr(image_paths, '__len__') else None
     if progress_callback:
-        progress_callback(0, total_images, "Starting feature extraction...")
-
-    print("Extracting features...")
-    for i, path in enumerate(image_paths):
-        features = extractor.extract(path)
-        if features is not None:
-            features_list.append(features)
-            valid_paths.append(path)
-        
+        progress_callback(0, total_known or 0, "Starting feature extraction...")
+
+    cache = None
+    if cache_dir:
+        cache = EmbeddingCache(cache_dir, model_name, embedding_version(model_name, quantize))
+
+    scanned = [] # Every input path, in input order
+    keys = {}
+    rows = {} # Path -> row in the cache (or in `matrix` without a cache)
+    hits = 0
+
+    def misses():
+        nonlocal hits
+        for path in image_paths:
+            scanned.append(path)
+            if cache:
+                keys[path] = cache.key_for(path)
+                row = cache.lookup([keys[path]])[0]
+                if row is not None:
+                    rows[path] = row
+                    hits += 1
+                    continue
+            yield path
+
+    def total():
+        return total_known if total_known is not None else len(scanned)
+
+    matrix = GrowableMatrix(capacity=total_known or 1024)
+    pending = misses()
+    first = next(pending, None)
+    # The model is only loaded when at least one image is not cached
+    if first is not None:
+        extractor = get_extractor(model_name=model_name, backend=backend, quantize=quantize, num_threads=num_threads)
+        print("Extracting features...")
+        last_checkpoint = time.monotonic()
+        for batch_paths, batch_features, consumed in extractor.iter_batches(itertools.chain([first], pending), batch_size=batch_size, num_workers=num_workers):
+            if cache:
+                batch_rows = cache.add([keys[p] for p in batch_paths], batch_features)
+            else:
+                batch_rows = range(matrix.size, matrix.size + len(batch_paths))
+                matrix.append_rows(batch_features)
+            rows.update(zip(batch_paths, batch_rows))
+            if cache and time.monotonic() - last_checkpoint >= checkpoint_interval:
+                cache.save()
+                last_checkpoint = time.monotonic()
+                print(f"Checkpoint: {cache.count} embeddings saved.")
+
+            if progress_callback:
+                progress_callback(hits + consumed, total(), f"Extracted features for {os.path.basename(batch_paths[-1])}")
+        if cache:
+            cache.save()
+
+    if cache and hits:
+        print(f"Loaded {hits} embeddings from cache.")
         if progress_callback:
-            progress_callback(i + 1, total_images, f"Extracted features for {os.path.basename(path)}")
-            
-    if not features_list:
-        return {}
+            progress_callback(total(), total(), f"Loaded {hits} cached embeddings")
 
-    features_matrix = np.array(features_list)
+    valid_paths = [p for p in scanned if p in rows]
+    if not valid_paths:
+        return [], None
+    if cache:
+        # Gather straight from the memory map; cached vectors are never re-decoded
+        return valid_paths, np.asarray(cache.vectors()[[rows[p] for p in valid_paths]])
+    return valid_paths, matrix.view()
+
+def group_images(image_paths, threshold=0.95, model_name="resnet50", progress_callback=None, batch_size=32, num_workers=0, cache_dir=None, neighbor_backend="exact", clustering="greedy", backend="eager", quantize=False, num_threads=None):
+    valid_paths, features_matrix = extract_features(
+        image_paths, model_name=model_name, progress_callback=progress_callback,
+        batch_size=batch_size, num_workers=num_workers, cache_dir=cache_dir,
+        backend=backend, quantize=quantize, num_threads=num_threads
+    )
+    if not valid_paths:
+        return {}
     
+    groups, _ = build_groups(valid_paths, features_matrix, threshold, neighbor_backend, clustering, progress_callback)
+    return groups
+
+def build_groups(valid_paths, features_matrix, threshold, neighbor_backend="exact", method="greedy", progress_callback=None):
+    """
+    Groups images from their similar pairs (see clustering.CLUSTERING_METHODS).
+    "greedy" is the original order-dependent pass; the other methods sort
+    paths first so the result does not depend on scan order.
+    Returns (groups, rep_rows) where rep_rows maps a group name to the row
+    of its representative (first) image in features_matrix.
+    """
+    total_images = len(valid_paths)
+    order = list(range(total_images))
+    if method != "greedy":
+        order.sort(key=valid_paths.__getitem__)
+        features_matrix = features_matrix[order]
+
     if progress_callback:
-        progress_callback(total_images, total_images, "Calculating similarity matrix...")
+        progress_callback(total_images, total_images, "Searching similar pairs...")
     
-    print("Calculating similarity matrix...")
-    similarity_matrix = cosine_similarity(features_matrix)
+    print(f"Searching similar pairs ({neighbor_backend})...")
+    neighbors, similarities = forward_neighbors(features_matrix, threshold, backend=neighbor_backend, return_similarities=True)
     
-    print("Grouping...")
+    print(f"Grouping ({method})...")
     if progress_callback:
         progress_callback(total_images, total_images, "Grouping images...")
 
-    visited = set()
     groups = {} 
-    
-    num_valid = len(valid_paths)
-    for i in range(num_valid):
-        if i in visited:
-            continue
-            
-        current_group = [valid_paths[i]]
-        visited.add(i)
-        
-        for j in range(i + 1, num_valid):
-            if j in visited:
-                continue
-            
-            sim = similarity_matrix[i, j]
-            if sim >= threshold:
-                current_group.append(valid_paths[j])
-                visited.add(j)
-        
-        rep_name = os.path.splitext(os.path.basename(valid_paths[i]))[0]
+    rep_rows = {}
+    for members in cluster(neighbors, similarities, method=method):
+        current_group = [valid_paths[order[m]] for m in members]
+        rep_name = os.path.splitext(os.path.basename(current_group[0]))[0]
         groups[rep_name] = current_group
+        rep_rows[rep_name] = order[members[0]]
         
-    return groups
+    return groups, rep_rows
+
+def _create_group_folder(target_dir, name):
+    # Create a safe folder name
+    # Use 'Group_' + name (trimmed if too long)
+    safe_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip()
+    folder_name = f"Group_{safe_name}"[:50] 
+    
+    # Ensure uniqueness if truncated
+    group_path = os.path.join(target_dir, folder_name)
+    suffix = 1
+    while os.path.exists(group_path):
+        group_path = os.path.join(target_dir, f"{folder_name}_{suffix}")
+        suffix += 1
+        
+    os.makedirs(group_path)
+    return group_path
 
-def move_groups(groups, target_dir, progress_callback=None):
+def _plan_dest(img_path, folder, planned):
+    """Picks the destination path for img_path inside folder, avoiding names already taken."""
+    filename = os.path.basename(img_path)
+    dest_path = os.path.join(folder, filename)
+    
+    base, ext = os.path.splitext(filename)
+    suffix = 1
+    while os.path.exists(dest_path) or dest_path in planned:
+        dest_path = os.path.join(folder, f"{base}_dup{suffix if suffix > 1 else ''}{ext}")
+        suffix += 1
+    planned.add(dest_path)
+    return dest_path
+
+def move_groups(groups, target_dir, progress_callback=None, link_mode="copy", workers=8, manifest=None):
+    """
+    Places groups into target_dir: one Group_* folder per group with more
+    than one image, singletons into Unique/. Files are copied (or linked,
+    see file_ops.LINK_MODES) concurrently after all destinations are chosen.
+    Every group is recorded in `manifest` (by default the target's own
+    manifest, which is then saved) so later stages can find its folder
+    without scanning the target.
+    Returns {name: {"id": manifest group id, "folder": group folder or None, "files": [placed paths]}}.
+    """
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
+    save_manifest = manifest is None
+    if save_manifest:
+        manifest = GroupManifest.load(target_dir) or GroupManifest(target_dir)
         
     count = 0
     total_groups = len(groups)
+    planned = set()
+    jobs = [] # (source, destination, group name)
+    placements = {}
     
     for i, (name, paths) in enumerate(groups.items()):
         if progress_callback:
             progress_callback(i, total_groups, f"Moving group {name}...")
 
         if len(paths) > 1:
-            # Create a safe folder name
-            # Use 'Group_' + name (trimmed if too long)
-            safe_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip()
-            folder_name = f"Group_{safe_name}"[:50] 
-            
-            # Ensure uniqueness if truncated
-            group_path = os.path.join(target_dir, folder_name)
-            suffix = 1
-            while os.path.exists(group_path):
-                group_path = os.path.join(target_dir, f"{folder_name}_{suffix}")
-                suffix += 1
-                
-            os.makedirs(group_path)
+            group_path = _create_group_folder(target_dir, name)
             
-            # print(f"Processing group {folder_name} with {len(paths)} images...")
-            for img_path in paths:
-                filename = os.path.basename(img_path)
-                dest_path = os.path.join(group_path, filename)
-                
-                if os.path.exists(dest_path):
-                    base, ext = os.path.splitext(filename)
-                    dest_path = os.path.join(group_path, f"{base}_dup{ext}")
-                
-                try:
-                    shutil.copy2(img_path, dest_path)
-                except Exception as e:
-                    print(f"Failed to copy {img_path}: {e}")
+            # print(f"Processing group {os.path.basename(group_path)} with {len(paths)} images...")
+            jobs.extend((img_path, _plan_dest(img_path, group_path, planned), name) for img_path in paths)
+            placements[name] = {"folder": group_path, "files": []}
             count += 1
         elif len(paths) == 1:
             # Handle Unique Images
@@ -178,121 +216,203 @@ def move_groups(groups, target_dir, progress_callback=None):
             if not os.path.exists(unique_dir):
                 os.makedirs(unique_dir)
                 
-            img_path = paths[0]
-            filename = os.path.basename(img_path)
-            dest_path = os.path.join(unique_dir, filename)
-            
-            if os.path.exists(dest_path):
-                base, ext = os.path.splitext(filename)
-                dest_path = os.path.join(unique_dir, f"{base}_dup{ext}")
+            jobs.append((paths[0], _plan_dest(paths[0], unique_dir, planned), name))
+            placements[name] = {"folder": None, "files": []}
             
-            try:
-                shutil.copy2(img_path, dest_path)
-            except Exception as e:
-                print(f"Failed to copy unique {img_path}: {e}")
+    results = place_files([(src, dest) for src, dest, _ in jobs], link_mode=link_mode, workers=workers, progress_callback=progress_callback)
+    for (_, _, name), dest_path in zip(jobs, results):
+        if dest_path:
+            placements[name]["files"].append(dest_path)
+
+    for name, placement in placements.items():
+        placement["id"] = manifest.unique_id(name)
+        manifest.set_group(placement["id"], groups[name], placement["folder"], placement["files"])
+    if save_manifest:
+        manifest.save()
             
-import google.generativeai as genai
+    return placements
 
-def rename_groups_with_gemini(groups, target_dir, api_key, progress_callback=None):
-    if not api_key:
-        print("No API Key provided. Skipping AI renaming.")
-        return
+def update_groups(image_paths, target_dir, threshold=0.95, model_name="resnet50", progress_callback=None, batch_size=32, num_workers=0, cache_dir=None, neighbor_backend="exact", clustering="greedy", incremental=True, link_mode="copy", backend="eager", quantize=False, resume=False, num_threads=None):
+    """
+    Groups images into target_dir and records the result in its manifest.
+    With incremental=True, images already in the manifest are skipped. New
+    images join the first existing group whose representative is similar
+    enough, or are grouped among themselves; only new files are copied.
+    Without a manifest for the same model and threshold (or with
+    incremental=False) every image is grouped and copied, like
+    group_images() + move_groups(). Returns the groups (all members) that
+    were created or grown.
+    Embeddings are checkpointed while extracting: into cache_dir if set,
+    otherwise into a checkpoint folder in target_dir that is removed once
+    the run completes. resume=True picks that folder up after a crash
+    instead of starting over (with cache_dir, resuming is automatic).
+    """
+    from feature_extractor import embedding_version
+    settings = {"grouper": "dl", "model": model_name, "weights": embedding_version(model_name, quantize), "threshold": threshold, "clustering": clustering}
+    manifest = GroupManifest.load(target_dir) if incremental else None
+    rep_vectors = manifest.load_vectors() if manifest else None
+    if manifest is None or manifest.settings != settings or rep_vectors is None or len(rep_vectors) != len(manifest.groups):
+        if manifest is not None:
+            print("Existing manifest was built with different settings; regrouping everything.")
+        manifest = GroupManifest(target_dir, settings)
+        rep_vectors = None
+
+    checkpoint_dir = os.path.join(target_dir, CHECKPOINT_DIR)
+    if cache_dir is None and os.path.exists(checkpoint_dir):
+        if resume:
+            print(f"Resuming from checkpoint in {checkpoint_dir}")
+        else:
+            shutil.rmtree(checkpoint_dir)
+
+    known = manifest.known_paths()
+    new_paths = (p for p in image_paths if os.path.abspath(p) not in known)
+    valid_paths, features_matrix = extract_features(
+        new_paths, model_name=model_name, progress_callback=progress_callback,
+        batch_size=batch_size, num_workers=num_workers, cache_dir=cache_dir or checkpoint_dir,
+        backend=backend, quantize=quantize, num_threads=num_threads
+    )
+    print(f"{len(valid_paths)} new images, {len(known)} already grouped.")
+    if not valid_paths:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        return {}
+
+    # 1. Match new images against existing group representatives (first match wins)
+    group_ids = list(manifest.groups)
+    grown = {} # Existing group id -> new member paths
+    unmatched = list(range(len(valid_paths)))
+    if rep_vectors is not None and len(rep_vectors):
+        reps = normalize(rep_vectors)
+        vectors = normalize(features_matrix)
+        unmatched = []
+        for start in range(0, len(vectors), 1024):
+            hits = (vectors[start:start + 1024] @ reps.T) >= threshold
+            first = np.where(hits.any(axis=1), hits.argmax(axis=1), -1)
+            for offset, g in enumerate(first.tolist()):
+                if g >= 0:
+                    grown.setdefault(group_ids[g], []).append(valid_paths[start + offset])
+                else:
+                    unmatched.append(start + offset)
+
+    # 2. Group the remaining new images among themselves
+    new_groups, rep_rows = build_groups([valid_paths[i] for i in unmatched], features_matrix[unmatched], threshold, neighbor_backend, clustering, progress_callback)
+
+    # 3. Copy only the new files
+    changed = {}
+    planned = set()
+    jobs = [] # (source, destination, group id)
+    for group_id, paths in grown.items():
+        entry = manifest.groups[group_id]
+        files = [manifest.absolute(f) for f in entry["files"]]
+        folder = manifest.absolute(entry["folder"]) if entry["folder"] else None
+        if folder is None:
+            # The group was a singleton in Unique/; give it its own folder now
+            folder = _create_group_folder(target_dir, group_id)
+            moved = []
+            for f in files:
+                dest_path = os.path.join(folder, os.path.basename(f))
+                try:
+                    os.replace(f, dest_path)
+                    moved.append(dest_path)
+                except OSError as e:
+                    print(f"Failed to move {f}: {e}")
+            files = moved
+        jobs.extend((p, _plan_dest(p, folder, planned), group_id) for p in paths)
+        members = entry["members"] + paths
+        # Keep extra fields such as the Gemini name so renaming stays idempotent
+        extra = {k: v for k, v in entry.items() if k not in ("members", "folder", "files")}
+        manifest.set_group(group_id, members, folder, files, **extra)
+        changed[group_id] = members
+
+    results = place_files([(src, dest) for src, dest, _ in jobs], link_mode=link_mode)
+    for (_, _, group_id), dest_path in zip(jobs, results):
+        if dest_path:
+            manifest.groups[group_id]["files"].append(manifest.relative(dest_path))
 
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-flash-latest')
-    except Exception as e:
-        print(f"Failed to configure Gemini: {e}")
+    # Records the new groups in the manifest, in new_groups order (= representative vector order)
+    placements = move_groups(new_groups, target_dir, progress_callback=progress_callback, link_mode=link_mode, manifest=manifest)
+    new_vectors = []
+    new_features = features_matrix[unmatched]
+    for name, paths in new_groups.items():
+        new_vectors.append(new_features[rep_rows[name]])
+        changed[placements[name]["id"]] = paths
+
+    if new_vectors:
+        rep_vectors = np.stack(new_vectors) if rep_vectors is None else np.concatenate([rep_vectors, np.stack(new_vectors)])
+    manifest.save_vectors(rep_vectors)
+    manifest.save()
+    # Kept until everything is placed, so a crash while copying doesn't cost the embeddings
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    print(f"{len(grown)} groups grew, {len(new_groups)} new groups.")
+    return changed
+            
+
+def rename_groups_with_gemini(groups, target_dir, api_key, progress_callback=None, concurrency=4, requests_per_minute=60, cache_path=None, model=None):
+    """
+    Renames each group folder in target_dir after a Gemini description of
+    its first image. Folders are looked up in the target's manifest (written
+    by move_groups/update_groups), which is updated with the new names.
+    Requests run concurrently (see gemini_renamer); a `model` such as
+    gemini_renamer.FakeModel replaces Gemini for offline runs. cache_path
+    keeps name suggestions between runs.
+    """
+    from gemini_renamer import GeminiModel, NameCache, suggest_names
+    manifest = GroupManifest.load(target_dir)
+    if manifest is None:
+        print(f"No grouping manifest in {target_dir}. Skipping AI renaming.")
         return
+    if model is None:
+        if not api_key:
+            print("No API Key provided. Skipping AI renaming.")
+            return
+        try:
+            model = GeminiModel(api_key)
+        except Exception as e:
+            print(f"Failed to configure Gemini: {e}")
+            return
 
     print("Starting AI Renaming...")
-    count = 0
     total_groups = len(groups)
     
-    # Filter groups that actually exist in target_dir (i.e. size > 1)
-    # The 'groups' dict has ALL groups, but we only moved those with len > 1
-    # We also need to find the folder name we assigned to them.
-    # Logic: Re-construct the folder name logic and check existence.
-    
-    for i, (name, paths) in enumerate(groups.items()):
-        if len(paths) <= 1:
-            continue
-            
-        if progress_callback:
-            progress_callback(i, total_groups, f"AI analyzing group {name}...")
-            
-        safe_name = "".join([c for c in name if c.isalnum() or c in (' ', '-', '_')]).strip()
-        folder_name_prefix = f"Group_{safe_name}"[:50]
-        
-        # Find the actual directory. It might have suffixes.
-        # We need to find which folder corresponds to this group. 
-        # Since we just moved them, we can try to find it.
-        # OR, better: We should have returned the mapping of group_id -> new_folder_path from move_groups.
-        # For now, let's search for the folder starting with this prefix in target_dir.
-        
-        found_dir = None
-        candidates = [d for d in os.listdir(target_dir) if d.startswith(folder_name_prefix) and os.path.isdir(os.path.join(target_dir, d))]
-        
-        if not candidates:
-            continue
-            
-        # If multiple candidates, it's risky. But 'name' comes from representative filename.
-        # Usually it's unique enough or we relied on order.
-        # Let's verify by checking if one of the images is inside.
-        
-        actual_group_path = None
-        for cand in candidates:
-            cand_path = os.path.join(target_dir, cand)
-            # Check if first image is there
-            test_img = os.path.basename(paths[0])
-            # It might meet a duplicate suffix, so check loosely
-            if any(test_img.split('.')[0] in f for f in os.listdir(cand_path)):
-                actual_group_path = cand_path
-                break
-        
-        if not actual_group_path:
-            continue
+    # Groups are matched to manifest entries by their first member; only groups with a folder get renamed,
+    # and folders renamed by an earlier run keep their name
+    by_first_member = {entry["members"][0]: group_id for group_id, entry in manifest.groups.items() if entry["members"]}
+    group_ids = {}
+    for name, paths in groups.items():
+        group_id = by_first_member.get(os.path.abspath(paths[0])) if paths else None
+        if group_id is not None and manifest.groups[group_id]["folder"] and not manifest.groups[group_id].get("ai_name"):
+            group_ids[name] = group_id
+
+    names = suggest_names(
+        {name: groups[name][0] for name in group_ids}, model, concurrency=concurrency,
+        requests_per_minute=requests_per_minute, cache=NameCache(cache_path), progress_callback=progress_callback
+    )
 
-        # Prepare Image for API
+    # Renames run one at a time so suffixes for clashing names stay consistent
+    count = 0
+    for name, clean_name in names.items():
+        entry = manifest.groups[group_ids[name]]
+        old_folder = entry["folder"]
+        new_path = os.path.join(target_dir, clean_name)
+        if os.path.abspath(new_path) == os.path.abspath(manifest.absolute(old_folder)):
+            # Already has this name; a suffix would rename it against itself
+            entry["ai_name"] = clean_name
+            continue
+        # If exists, append suffix
+        suffix = 1
+        final_path = new_path
+        while os.path.exists(final_path):
+            final_path = f"{new_path}_{suffix}"
+            suffix += 1
         try:
-            sample_img_path = paths[0]
-            img = Image.open(sample_img_path)
-            
-            prompt = (
-                "Sana gönderdiğim görseldeki ürünü analiz et; türünü, ana rengini ve belirgin desenini tespit et. "
-                "Bunu bilgisayar dosya sistemi için uygun, Türkçe karakter ve boşluk içermeyen, "
-                "kelimelerin arasına tire (-) koyduğun, maksimum 4-5 kelimelik kısa ve net bir dosya ismine dönüştür. "
-                "Cevap olarak sadece ürettiğin dosya ismini yaz, başka açıklama yapma."
-            )
-            
-            response = model.generate_content([prompt, img])
-            new_name = response.text.strip()
-            
-            # Clean up response just in case
-            valid_chars = "-_.() abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
-            clean_name = "".join(c for c in new_name if c in valid_chars)
-            clean_name = clean_name.replace(" ", "-")
-            
-            if not clean_name:
-                continue
-                
-            new_path = os.path.join(target_dir, clean_name)
-            
-            # Use 'Category_' prefix? Or just the name? User said "file name", implied folder name.
-            # If exists, append suffix
-            suffix = 1
-            final_path = new_path
-            while os.path.exists(final_path):
-                final_path = f"{new_path}_{suffix}"
-                suffix += 1
-            
-            os.rename(actual_group_path, final_path)
-            # print(f"Renamed {os.path.basename(actual_group_path)} -> {os.path.basename(final_path)}")
-            count += 1
-            
-        except Exception as e:
+            os.rename(manifest.absolute(old_folder), final_path)
+        except OSError as e:
             print(f"Error renaming group {name}: {e}")
-            # If API fails, just skip
+            continue
+        entry["folder"] = manifest.relative(final_path)
+        entry["ai_name"] = clean_name
+        entry["files"] = [os.path.join(entry["folder"], os.path.relpath(f, old_folder)) for f in entry["files"]]
+        count += 1
+    manifest.save()
             
     if progress_callback:
         progress_callback(total_groups, total_groups, f"AI Renaming Complete. Renamed {count} folders.")
@@ -304,6 +424,19 @@ def main():
     parser.add_argument("--threshold", type=float, default=0.90, help="Cosine similarity threshold (0.0-1.0). Default 0.90")
     parser.add_argument("--model", default="resnet50", choices=["resnet50", "resnet152", "vit_b_16", "vit_l_16"], help="Model to use")
     parser.add_argument("--api-key", help="Gemini API Key for auto-renaming", default=None)
+    parser.add_argument("--gemini-concurrency", type=int, default=4, help="Parallel Gemini requests. Default 4")
+    parser.add_argument("--gemini-rpm", type=float, default=60, help="Gemini requests per minute limit. Default 60")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per model forward pass. Default 32")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Decode/preprocess worker processes (0 = in-process)")
+    parser.add_argument("--neighbors", default="exact", choices=["exact", "ivf"], help="Similar-pair search: exact blocked search or approximate IVF index")
+    parser.add_argument("--clustering", default="greedy", choices=list(CLUSTERING_METHODS), help="greedy (original, order-dependent), components (single linkage) or complete (complete linkage)")
+    parser.add_argument("--backend", default="eager", choices=["eager", "torchscript", "onnx"], help="Inference backend; torchscript/onnx exports are cached after the first run")
+    parser.add_argument("--int8", action="store_true", help="Dynamic int8 quantization (CPU)")
+    parser.add_argument("--threads", type=int, default=None, help="torch/ONNX Runtime intra-op threads")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the persistent embedding cache (disabled if omitted)")
+    parser.add_argument("--incremental", action="store_true", help="Only add images not yet in the target's manifest to existing groups")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run from its checkpoint in the target")
+    parser.add_argument("--link-mode", default="copy", choices=list(LINK_MODES), help="How files are placed in the target (falls back to copy across filesystems)")
     
     args = parser.parse_args()
     
@@ -311,17 +444,19 @@ def main():
         print(f"Source not found: {args.source}")
         return
 
-    images = get_image_paths(args.source)
-    print(f"Found {len(images)} images.")
+    # Scanning runs in the background and overlaps with feature extraction
+    images = scan_image_paths(args.source)
+    options = dict(backend=args.backend, quantize=args.int8, num_threads=args.threads, model_name=args.model, batch_size=args.batch_size, num_workers=args.workers, cache_dir=args.cache_dir, neighbor_backend=args.neighbors, clustering=args.clustering)
+    groups = update_groups(images, args.target, args.threshold, incremental=args.incremental, link_mode=args.link_mode, resume=args.resume, **options)
+    print(f"Grouped {sum(len(paths) for paths in groups.values())} images.")
     
-    if not images:
+    if not groups:
         return
 
-    groups = group_images(images, args.threshold, model_name=args.model)
-    move_groups(groups, args.target)
-    
     if args.api_key:
-        rename_groups_with_gemini(groups, args.target, args.api_key)
+        name_cache = os.path.join(args.cache_dir, "gemini_names.json") if args.cache_dir else None
+        rename_groups_with_gemini(groups, args.target, args.api_key, concurrency=args.gemini_concurrency,
+                                  requests_per_minute=args.gemini_rpm, cache_path=name_cache)
         
     print("Done.")
 
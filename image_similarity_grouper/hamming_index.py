@@ -0,0 +1,80 @@
+import numpy as np
+
+if hasattr(np, "bitwise_count"):
+    def popcount64(values):
+        return np.bitwise_count(values)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount64(values):
+        values = np.ascontiguousarray(values, dtype=np.uint64)
+        return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def hash_to_int(image_hash):
+    """Packs a 64-bit imagehash.ImageHash into a Python int."""
+    bits = np.asarray(image_hash.hash, dtype=bool).flatten()
+    if bits.size != 64:
+        raise ValueError(f"Only 64-bit hashes are supported, got {bits.size} bits")
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class HammingIndex:
+    """
+    Ordered set of 64-bit hashes answering "first stored hash within
+    `max_distance` bits of this one".
+
+    Hashes live in a growing NumPy uint64 array and distances are computed
+    with a vectorized popcount. When `max_distance` is small the hash is
+    also split into max_distance + 1 chunks (multi-index hashing): by the
+    pigeonhole principle any match agrees exactly on at least one chunk,
+    so only hashes sharing a chunk value need to be checked.
+    """
+    def __init__(self, max_distance, capacity=1024, max_chunks=8):
+        self.max_distance = max_distance
+        self.hashes = np.empty(capacity, dtype=np.uint64)
+        self.size = 0
+
+        num_chunks = max_distance + 1
+        if 1 <= num_chunks <= max_chunks:
+            bounds = np.linspace(0, 64, num_chunks + 1).astype(int)
+            self.chunks = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(bounds[:-1], bounds[1:])]
+            self.buckets = [{} for _ in self.chunks]
+        else:
+            self.chunks = None
+            self.buckets = None
+
+    def __len__(self):
+        return self.size
+
+    def add(self, value):
+        """Appends a hash and returns its position."""
+        if self.size == len(self.hashes):
+            self.hashes = np.concatenate([self.hashes, np.empty(len(self.hashes), dtype=np.uint64)])
+        position = self.size
+        self.hashes[position] = value
+        self.size += 1
+        if self.chunks:
+            for (shift, mask), bucket in zip(self.chunks, self.buckets):
+                bucket.setdefault((value >> shift) & mask, []).append(position)
+        return position
+
+    def first_within(self, value):
+        """Position of the earliest stored hash within max_distance of value, or -1."""
+        if self.max_distance < 0 or not self.size:
+            return -1
+
+        if self.chunks:
+            candidates = []
+            for (shift, mask), bucket in zip(self.chunks, self.buckets):
+                hits = bucket.get((value >> shift) & mask)
+                if hits:
+                    candidates.extend(hits)
+            if not candidates:
+                return -1
+            candidates = np.unique(np.array(candidates, dtype=np.int64))
+            distances = popcount64(self.hashes[candidates] ^ np.uint64(value))
+            matches = np.flatnonzero(distances <= self.max_distance)
+            return int(candidates[matches[0]]) if len(matches) else -1
+
+        distances = popcount64(self.hashes[:self.size] ^ np.uint64(value))
+        matches = np.flatnonzero(distances <= self.max_distance)
+        return int(matches[0]) if len(matches) else -1
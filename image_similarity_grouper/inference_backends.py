@@ -0,0 +1,91 @@
+import os
+import torch
+import torch.nn as nn
+
+BACKENDS = ("eager", "torchscript", "onnx")
+
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "image_grouper", "models")
+
+def artifact_path(artifact_dir, model_name, weights_version, backend, quantize):
+    safe_weights = "".join(c if c.isalnum() else "_" for c in weights_version)
+    ext = ".onnx" if backend == "onnx" else ".pt"
+    suffix = "_int8" if quantize else ""
+    return os.path.join(artifact_dir, f"{model_name}_{safe_weights}_{backend}{suffix}{ext}")
+
+def _quantize_eager(model):
+    # Dynamic int8 only covers Linear layers: most of a ViT, only the head of a ResNet
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+class _OnnxModel:
+    """Makes an ONNX Runtime session callable like a torch module."""
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, input_batch):
+        outputs = self.session.run(None, {self.input_name: input_batch.cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        return self
+
+def build_backend(model, model_name, weights_version, backend="eager", quantize=False,
+                  num_threads=None, artifact_dir=None, input_size=224):
+    """
+    Wraps an eager float32 model in the requested CPU inference backend.
+    TorchScript and ONNX exports are written to artifact_dir once and
+    reused on later runs. quantize=True applies dynamic int8 quantization
+    (torch for eager/torchscript, ONNX Runtime for onnx).
+    Returns a callable mapping an input batch tensor to a feature tensor.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}. Choose from {', '.join(BACKENDS)}")
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    model.eval()
+
+    if backend == "eager":
+        return _quantize_eager(model) if quantize else model
+
+    artifact_dir = artifact_dir or DEFAULT_ARTIFACT_DIR
+    os.makedirs(artifact_dir, exist_ok=True)
+    path = artifact_path(artifact_dir, model_name, weights_version, backend, quantize)
+    example = torch.randn(2, 3, input_size, input_size)
+
+    if backend == "torchscript":
+        if not os.path.exists(path):
+            print(f"Exporting TorchScript model to {path}...")
+            source = _quantize_eager(model) if quantize else model
+            with torch.no_grad():
+                traced = torch.jit.freeze(torch.jit.trace(source, example))
+            traced.save(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        return torch.jit.load(path, map_location="cpu")
+
+    # ONNX
+    if not os.path.exists(path):
+        float_path = artifact_path(artifact_dir, model_name, weights_version, backend, False)
+        if not os.path.exists(float_path):
+            print(f"Exporting ONNX model to {float_path}...")
+            torch.onnx.export(
+                model, example, float_path + ".tmp",
+                input_names=["input"], output_names=["features"],
+                dynamic_axes={"input": {0: "batch"}, "features": {0: "batch"}},
+                opset_version=17, dynamo=False,
+            )
+            os.replace(float_path + ".tmp", float_path)
+        if quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            print(f"Quantizing ONNX model to {path}...")
+            # Like the torch path, only MatMul/Gemm: ConvInteger kernels are slower than float convs
+            quantize_dynamic(float_path, path + ".tmp", weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul", "Gemm"])
+            os.replace(path + ".tmp", path)
+    # Follow torch.set_num_threads unless told otherwise
+    return _OnnxModel(path, num_threads or torch.get_num_threads())
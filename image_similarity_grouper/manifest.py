@@ -0,0 +1,134 @@
+import os
+import json
+import argparse
+import numpy as np
+
+MANIFEST_FILE = ".grouper_manifest.json"
+REPRESENTATIVES_FILE = ".grouper_representatives.npy"
+# Embeddings of a run in progress when no embedding cache is configured
+CHECKPOINT_DIR = ".grouper_checkpoint"
+
+class GroupManifest:
+    """
+    Record of a grouping run, stored in the target directory.
+
+    groups maps a group id to
+        {"members": [source paths], "folder": folder relative to target or None,
+         "files": [copied files relative to target], ...extra per-grouper fields}
+    in creation order, which is the greedy assignment order. settings holds
+    the parameters (grouper, model, threshold...) the groups were built with;
+    incremental runs only reuse a manifest whose settings match.
+    """
+    def __init__(self, target_dir, settings=None):
+        self.target_dir = target_dir
+        self.settings = settings or {}
+        self.groups = {}
+
+    @property
+    def path(self):
+        return os.path.join(self.target_dir, MANIFEST_FILE)
+
+    @classmethod
+    def load(cls, target_dir):
+        """Returns the saved manifest, or None if there is none (or it is unreadable)."""
+        manifest = cls(target_dir)
+        if not os.path.exists(manifest.path):
+            return None
+        try:
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable manifest {manifest.path}: {e}")
+            return None
+        manifest.settings = data.get("settings", {})
+        manifest.groups = data.get("groups", {})
+        return manifest
+
+    def save(self):
+        os.makedirs(self.target_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"settings": self.settings, "groups": self.groups}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def known_paths(self):
+        return {os.path.abspath(p) for group in self.groups.values() for p in group["members"]}
+
+    def unique_id(self, name):
+        """name, or name_N if a group with that id already exists."""
+        group_id = name
+        suffix = 1
+        while group_id in self.groups:
+            group_id = f"{name}_{suffix}"
+            suffix += 1
+        return group_id
+
+    def set_group(self, group_id, members, folder, files, **extra):
+        self.groups[group_id] = {
+            "members": [os.path.abspath(p) for p in members],
+            "folder": self.relative(folder) if folder else None,
+            "files": [self.relative(f) for f in files],
+            **extra,
+        }
+
+    def relative(self, path):
+        return os.path.relpath(path, self.target_dir)
+
+    def absolute(self, rel_path):
+        return os.path.join(self.target_dir, rel_path)
+
+    # --- Representative vectors (DL grouper) ---
+    def save_vectors(self, vectors):
+        np.save(os.path.join(self.target_dir, REPRESENTATIVES_FILE), np.asarray(vectors, dtype=np.float32))
+
+    def load_vectors(self):
+        path = os.path.join(self.target_dir, REPRESENTATIVES_FILE)
+        if not os.path.exists(path):
+            return None
+        return np.load(path)
+
+    # --- Reporting ---
+    def summary(self, verify=False):
+        """
+        Counts taken from the manifest alone. verify=True also stats every
+        recorded file and reports the ones missing from the target.
+        """
+        folders = [g for g in self.groups.values() if g["folder"]]
+        stats = {
+            "groups": len(self.groups),
+            "folders": len(folders),
+            "singletons": len(self.groups) - len(folders),
+            "members": sum(len(g["members"]) for g in self.groups.values()),
+            "files": sum(len(g["files"]) for g in self.groups.values()),
+            "largest": max((len(g["members"]) for g in self.groups.values()), default=0),
+        }
+        if verify:
+            stats["missing"] = [f for g in self.groups.values() for f in g["files"] if not os.path.exists(self.absolute(f))]
+        return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on a grouping run from its manifest, without crawling the target.")
+    parser.add_argument("--target", required=True, help="Target directory of a grouping run")
+    parser.add_argument("--verify", action="store_true", help="Also check that every recorded file still exists")
+    parser.add_argument("--list", action="store_true", help="List each group folder and its size")
+    args = parser.parse_args()
+
+    manifest = GroupManifest.load(args.target)
+    if manifest is None:
+        print(f"No manifest in {args.target}")
+        return
+    print(f"Settings: {manifest.settings}")
+    stats = manifest.summary(verify=args.verify)
+    print(f"{stats['groups']} groups ({stats['folders']} folders, {stats['singletons']} single images), "
+          f"{stats['members']} images, {stats['files']} placed files, largest group {stats['largest']}")
+    if args.list:
+        for group_id, entry in manifest.groups.items():
+            if entry["folder"]:
+                print(f"  {entry['folder']}: {len(entry['members'])} images ({group_id})")
+    if args.verify:
+        for f in stats["missing"]:
+            print(f"  missing: {f}")
+        print(f"{len(stats['missing'])} recorded files missing.")
+
+if __name__ == "__main__":
+    main()
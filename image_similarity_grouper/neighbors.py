@@ -0,0 +1,130 @@
+import numpy as np
+
+def normalize(features):
+    """L2-normalizes rows as float32 so dot products are cosine similarities."""
+    features = np.asarray(features, dtype=np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return features / norms
+
+def _pairs_to_lists(n, rows, cols, values):
+    """
+    Turns (i, j) pairs into per-row lists of sorted neighbour indices and
+    the matching similarities.
+    """
+    order = np.lexsort((cols, rows))
+    rows = rows[order]
+    cols = cols[order]
+    values = values[order]
+    bounds = np.searchsorted(rows, np.arange(n + 1))
+    return ([cols[bounds[i]:bounds[i + 1]] for i in range(n)],
+            [values[bounds[i]:bounds[i + 1]] for i in range(n)])
+
+class ExactIndex:
+    """
+    Exact range search with blocked matrix products.
+    Only a (block_size x N) slice of similarities exists at any time,
+    instead of the full N x N float64 matrix.
+    """
+    def __init__(self, features, block_size=1024):
+        self.vectors = normalize(features)
+        self.block_size = block_size
+
+    def forward_neighbors(self, threshold):
+        n = len(self.vectors)
+        rows = []
+        cols = []
+        values = []
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            # Only j > i is needed, so compare the block against itself and everything after it
+            sims = self.vectors[start:end] @ self.vectors[start:].T
+            r, c = np.nonzero(sims >= threshold)
+            c = c + start
+            r = r + start
+            keep = c > r
+            values.append(sims[r[keep] - start, c[keep] - start])
+            rows.append(r[keep])
+            cols.append(c[keep])
+        if not rows:
+            return [], []
+        return _pairs_to_lists(n, np.concatenate(rows), np.concatenate(cols), np.concatenate(values))
+
+class IVFIndex:
+    """
+    Approximate range search with an inverted-file index.
+    Vectors are bucketed by spherical k-means; each query is only compared
+    against the members of its `nprobe` closest buckets.
+    """
+    def __init__(self, features, nlist=None, nprobe=8, iterations=10, seed=0, block_size=4096):
+        self.vectors = normalize(features)
+        n = len(self.vectors)
+        self.nlist = max(1, min(nlist or int(np.sqrt(n)), n))
+        self.nprobe = max(1, min(nprobe, self.nlist))
+        self.block_size = block_size
+
+        rng = np.random.default_rng(seed)
+        self.centroids = self.vectors[rng.choice(n, self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._nearest_lists(1)[:, 0]
+            for c in range(self.nlist):
+                members = self.vectors[assignment == c]
+                if len(members):
+                    self.centroids[c] = members.sum(axis=0)
+            self.centroids = normalize(self.centroids)
+
+        assignment = self._nearest_lists(1)[:, 0]
+        self.lists = [np.flatnonzero(assignment == c) for c in range(self.nlist)]
+
+    def _nearest_lists(self, k):
+        result = np.empty((len(self.vectors), k), dtype=np.int64)
+        for start in range(0, len(self.vectors), self.block_size):
+            sims = self.vectors[start:start + self.block_size] @ self.centroids.T
+            if k == 1:
+                result[start:start + self.block_size, 0] = np.argmax(sims, axis=1)
+            else:
+                result[start:start + self.block_size] = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        return result
+
+    def forward_neighbors(self, threshold):
+        n = len(self.vectors)
+        probes = self._nearest_lists(self.nprobe)
+        rows = []
+        cols = []
+        values = []
+        # Work bucket by bucket: every query probing bucket c is compared to its members at once
+        for c, members in enumerate(self.lists):
+            if not len(members):
+                continue
+            queries = np.flatnonzero((probes == c).any(axis=1))
+            for start in range(0, len(queries), self.block_size):
+                q = queries[start:start + self.block_size]
+                sims = self.vectors[q] @ self.vectors[members].T
+                r, m = np.nonzero(sims >= threshold)
+                keep = members[m] > q[r]
+                values.append(sims[r[keep], m[keep]])
+                rows.append(q[r[keep]])
+                cols.append(members[m[keep]])
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return [empty] * n, [empty.astype(np.float32)] * n
+        return _pairs_to_lists(n, np.concatenate(rows), np.concatenate(cols), np.concatenate(values))
+
+BACKENDS = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
+
+def forward_neighbors(features, threshold, backend="exact", return_similarities=False, **kwargs):
+    """
+    For every row i returns the sorted indices j > i whose cosine
+    similarity to i is at least `threshold`. With return_similarities=True
+    returns (neighbors, similarities) with matching per-row arrays.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown neighbour backend: {backend}. Choose from {', '.join(BACKENDS)}")
+    if not len(features):
+        neighbors, similarities = [], []
+    else:
+        neighbors, similarities = BACKENDS[backend](features, **kwargs).forward_neighbors(threshold)
+    return (neighbors, similarities) if return_similarities else neighbors
@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+import numpy as np
+
+_DONE = object()
+
+def iter_image_paths(source_dir, image_extensions):
+    """
+    Lazily yields image paths under source_dir using os.scandir.
+    Order matches os.walk (top-down: a folder's files, then its subfolders),
+    so results are identical to the old list-building scanners.
+    """
+    try:
+        with os.scandir(source_dir) as it:
+            entries = list(it)
+    except OSError as e:
+        print(f"Cannot scan {source_dir}: {e}")
+        return
+
+    subdirs = []
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                # Like os.walk, do not follow symlinked folders
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in image_extensions:
+                yield entry.path
+        except OSError:
+            continue
+
+    for subdir in subdirs:
+        yield from iter_image_paths(subdir, image_extensions)
+
+def prefetch(iterable, maxsize=1024):
+    """
+    Runs `iterable` in a background thread and yields its items through a
+    bounded queue, so a slow producer (e.g. scanning an external disk)
+    overlaps with the consumer without buffering everything in memory.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            print(f"Producer failed: {e}")
+        finally:
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        # Consumer stopped early: release the producer
+        stop.set()
+
+class GrowableMatrix:
+    """
+    Preallocated float32 row buffer that doubles its capacity when full.
+    Rows are written in place instead of collecting per-image arrays in a
+    list and copying them all into a new matrix at the end.
+    """
+    def __init__(self, capacity=1024):
+        self.capacity = max(1, capacity)
+        self.data = None
+        self.size = 0
+
+    def append_rows(self, rows):
+        rows = np.asarray(rows, dtype=np.float32)
+        if self.data is None:
+            self.data = np.empty((self.capacity, rows.shape[1]), dtype=np.float32)
+        needed = self.size + len(rows)
+        if needed > len(self.data):
+            grown = np.empty((max(needed, len(self.data) * 2), self.data.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = rows
+        self.size = needed
+
+    def view(self):
+        """The filled rows, without copying."""
+        if self.data is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.data[:self.size]
@@ -0,0 +1,17 @@
+from id_registry import IdRegistry
+
+def test_duplicate_keeps_its_id_after_original_is_removed(tmp_path):
+    path = str(tmp_path / "_ID_KAYDI.json")
+    registry = IdRegistry(path)
+    assert registry.allocate_all([('A', 'd'), ('B', 'd')]) == {'A': 1, 'B': 2}
+    registry.save()
+
+    registry = IdRegistry(path)
+    assert registry.allocate_all([('B', 'd')]) == {'B': 2}
+    # Asil geri gelirse eski numarasini alir
+    assert registry.allocate_all([('A', 'd'), ('B', 'd')]) == {'A': 1, 'B': 2}
+
+def test_moved_file_keeps_its_id(tmp_path):
+    registry = IdRegistry(str(tmp_path / "_ID_KAYDI.json"))
+    assert registry.allocate_all([('A', 'd'), ('C', 'e')]) == {'A': 1, 'C': 2}
+    assert registry.allocate_all([('A2', 'd'), ('C', 'e'), ('N', 'f')]) == {'A2': 1, 'C': 2, 'N': 3}
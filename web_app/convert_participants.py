@@ -2,15 +2,43 @@
 import pandas as pd
 import json
 import os
+import sys
 
+# Shared database (datastore.py in the repo root) written by yarisma_duzenleyici.py;
+# the Excel file is only used as a fallback
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import datastore
+
+DB_PATH = datastore.DB_PATH
 EXCEL_PATH = "/Volumes/KIOXIA/fotograf_yarismasi/fotograf_yarismasi/KATILIMCI_ESLESME_LISTESI.xlsx"
 OUTPUT_PATH = "/Volumes/KIOXIA/fotograf_yarismasi/fotograf_yarismasi/web_app/src/data/participants.json"
 
+def read_from_db(db_path):
+    """{jury file name: participant} for photos in the jury pool, via an indexed query."""
+    conn = datastore.connect(db_path)
+    try:
+        return datastore.participant_names(conn)
+    finally:
+        conn.close()
+
+def write_mapping(mapping):
+    # Write to JSON
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, ensure_ascii=False, indent=2)
+
+    print(f"Successfully converted. Saved to {OUTPUT_PATH}")
+    print(f"Total entries: {len(mapping)}")
+
 def convert_excel_to_json():
     try:
         # Create output directory if it doesn't exist
         os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 
+        if os.path.exists(DB_PATH):
+            print(f"Reading participants from {DB_PATH}")
+            write_mapping(read_from_db(DB_PATH))
+            return
+
         # Read Excel
         # Assuming columns like 'Yarisma ID' or 'ID' and 'Ad Soyad' or similar to match. 
         # Since I haven't seen the columns, I'll print the head first to debug if needed, 
@@ -56,12 +84,7 @@ def convert_excel_to_json():
             clean_name = str(row[name_col]).strip()
             mapping[clean_id] = clean_name
             
-        # Write to JSON
-        with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-            json.dump(mapping, f, ensure_ascii=False, indent=2)
-            
-        print(f"Successfully converted. Saved to {OUTPUT_PATH}")
-        print(f"Total entries: {len(mapping)}")
+        write_mapping(mapping)
         
     except Exception as e:
         print(f"Error: {e}")
@@ -124,7 +124,7 @@ export default function GalleryPage() {
                 onClick={() => handleVoteClick(photo)}
               >
                 <Image
-                  src={photo.url}
+                  src={photo.urls?.grid ?? photo.url}
                   alt={photo.id}
                   fill
                   className="object-cover transition-transform duration-300 group-hover:scale-105"
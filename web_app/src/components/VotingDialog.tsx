@@ -129,7 +129,7 @@ export function VotingDialog({ open, onOpenChange, photo }: VotingDialogProps) {
                     <div className="flex-1 relative w-full h-[50vh] md:h-full bg-black">
                         <div className="relative w-full h-full p-4">
                             <Image
-                                src={photo.url}
+                                src={photo.urls?.full ?? photo.url}
                                 alt={photo.id}
                                 fill
                                 className="object-contain"
@@ -1,115 +1,305 @@
 import os
+import re
 import shutil
+import argparse
 import pandas as pd
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from id_registry import IdRegistry, ID_WIDTH
+from dedup import find_duplicates, BENZERLIK_ESIGI
+from image_check import check_all, MAX_BYTES
+import datastore
 
-def main():
-    # 1. Girdi ve Yol Bilgileri
-    ANA_DIZIN = "/Volumes/KIOXIA/fotograf_yarismasi"
-    JURI_KLASOR_ADI = "_JURI_OYLAMA_HAVUZU"
-    JURI_KLASOR_YOLU = os.path.join(ANA_DIZIN, JURI_KLASOR_ADI)
-    
-    EXCEL_DOSYA_ADI = "KATILIMCI_ESLESME_LISTESI.xlsx"
-    EXCEL_DOSYA_YOLU = os.path.join(ANA_DIZIN, EXCEL_DOSYA_ADI)
+# 1. Girdi ve Yol Bilgileri
+ANA_DIZIN = datastore.ANA_DIZIN
+JURI_KLASOR_ADI = "_JURI_OYLAMA_HAVUZU"
+EXCEL_DOSYA_ADI = "KATILIMCI_ESLESME_LISTESI.xlsx"
 
-    # Desteklenen resim formatları
-    RESIM_UZANTILARI = {'.jpg', '.jpeg', '.png'} # Küçük harfle kontrol edilecek
+# İçerik özeti -> ID kaydı; ID'ler buradan verilir ve çalıştırmalar arasında değişmez
+ID_KAYIT_DOSYA_ADI = "_ID_KAYDI.json"
 
-    print(f"--- İşlem Başlıyor ---")
-    print(f"Ana Dizin: {ANA_DIZIN}")
+# Kopya kontrolünde hesaplanan pHash'ler (içerik özetine göre)
+PHASH_ONBELLEK_DOSYA_ADI = "_PHASH_ONBELLEK.json"
 
-    # Ana dizin kontrolü
-    if not os.path.exists(ANA_DIZIN):
-        print(f"HATA: Ana dizin bulunamadı: {ANA_DIZIN}")
-        print("Lütfen harici diskin takılı ve yolun doğru olduğundan emin olun.")
-        return
+# Bundan büyük dosyalar reddedilir (bayt)
+EN_BUYUK_DOSYA = MAX_BYTES
 
-    # 2. Jüri klasörünü oluştur veya temizle
-    if os.path.exists(JURI_KLASOR_YOLU):
-        print(f"Klasör temizleniyor: {JURI_KLASOR_YOLU}")
-        # İçindeki dosyaları silmek için
-        for dosya in os.listdir(JURI_KLASOR_YOLU):
-            dosya_yolu = os.path.join(JURI_KLASOR_YOLU, dosya)
-            try:
-                if os.path.isfile(dosya_yolu) or os.path.islink(dosya_yolu):
-                    os.unlink(dosya_yolu)
-                elif os.path.isdir(dosya_yolu):
-                    shutil.rmtree(dosya_yolu)
-            except Exception as e:
-                print(f"Dosya silinirken hata: {e}")
-    else:
-        print(f"Klasör oluşturuluyor: {JURI_KLASOR_YOLU}")
-        os.makedirs(JURI_KLASOR_YOLU)
+# Desteklenen resim formatları
+RESIM_UZANTILARI = {'.jpg', '.jpeg', '.png'} # Küçük harfle kontrol edilecek
 
-    # Veri seti için liste
-    kayitlar = []
-    
-    # Sayaç
-    sayac = 1
+# Aynı anda yapılan kopya sayısı (harici disk/ağ gecikmesini örtmek için)
+KOPYALAMA_ISCI = 8
 
-    # 3. Ana dizindeki alt klasörleri tara
-    # Ana dizindeki tüm öğeleri listele
-    for eleman in os.listdir(ANA_DIZIN):
-        eleman_yolu = os.path.join(ANA_DIZIN, eleman)
+ID_KALIBI = re.compile(r"^YARISMA_ID_(\d+)")
 
-        # Sadece klasörleri işle
-        if not os.path.isdir(eleman_yolu):
-            continue
+def eslesmeyi_oku(db_yolu, excel_yolu):
+    """Önceki çalıştırmanın eşleşmesi: {(katılımcı, orijinal dosya adı): jüri dosya adı}"""
+    if os.path.exists(db_yolu):
+        conn = datastore.connect(db_yolu)
+        try:
+            eslesme = {
+                (katilimci, dosya): juri_dosyasi
+                for katilimci, dosya, juri_dosyasi in conn.execute(
+                    "SELECT participant, original_name, jury_file FROM participants WHERE jury_file IS NOT NULL")
+            }
+        finally:
+            conn.close()
+        if eslesme:
+            return eslesme
+    # Veritabanından önceki sürümlerin ürettiği Excel listesi
+    if not os.path.exists(excel_yolu):
+        return {}
+    df = pd.read_excel(excel_yolu)
+    return {
+        (str(satir['Katılımcı Adı']), str(satir['Orijinal Dosya Adı'])): str(satir['Jüri Dosya Adı'])
+        for _, satir in df.iterrows()
+    }
 
-        # Özel klasörleri ve sistem dosyalarını atla
-        if eleman == JURI_KLASOR_ADI or eleman.startswith('.'):
-            continue
+def kaynaklari_tara(ana_dizin, juri_klasor_adi):
+    """Katılımcı klasörlerindeki resimler: [(katılımcı, dosya adı, tam yol)]"""
+    kaynaklar = []
+    for eleman in os.listdir(ana_dizin):
+        eleman_yolu = os.path.join(ana_dizin, eleman)
 
-        katilimci_adi = eleman
-        print(f"\nİşleniyor: {katilimci_adi}")
+        # Sadece klasörleri işle; özel klasörleri ve sistem dosyalarını atla
+        if not os.path.isdir(eleman_yolu) or eleman == juri_klasor_adi or eleman.startswith('.'):
+            continue
 
-        # 4. Alt klasördeki resim dosyalarını bul
         for dosya_adi in os.listdir(eleman_yolu):
             dosya_tam_yolu = os.path.join(eleman_yolu, dosya_adi)
-            
-            # Dosya mı diye kontrol et
-            if not os.path.isfile(dosya_tam_yolu):
+            # macOS'un "._" kaynak çatalı dosyaları resim değildir
+            if dosya_adi.startswith('.') or not os.path.isfile(dosya_tam_yolu):
                 continue
-
-            # Uzantı kontrolü
-            dosya_uzantisi = os.path.splitext(dosya_adi)[1].lower()
-            if dosya_uzantisi not in RESIM_UZANTILARI:
+            if os.path.splitext(dosya_adi)[1].lower() not in RESIM_UZANTILARI:
                 continue
-            
-            # Orijinal uzantıyı koru (büyük/küçük harf duyarlı olabilir, dosya isminden alalım)
-            orijinal_uzanti = os.path.splitext(dosya_adi)[1]
-
-            # 5. Benzersiz ve anonim dosya ismi üret
-            yeni_dosya_adi = f"YARISMA_ID_{sayac:03d}{orijinal_uzanti}"
-            hedef_dosya_yolu = os.path.join(JURI_KLASOR_YOLU, yeni_dosya_adi)
-
-            # 6. KOPYALA
-            shutil.copy2(dosya_tam_yolu, hedef_dosya_yolu)
-            print(f"  -> Kopyalandı: {yeni_dosya_adi}")
-
-            # 7. Veri setine ekle
-            kayitlar.append({
-                'Jüri Dosya Adı': yeni_dosya_adi,
-                'Katılımcı Adı': katilimci_adi,
-                'Orijinal Dosya Adı': dosya_adi
-            })
-
-            sayac += 1
-
-    # 8. Excel olarak kaydet
-    print("\n--- Excel Dosyası Oluşturuluyor ---")
-    if kayitlar:
-        df = pd.DataFrame(kayitlar)
+            kaynaklar.append((eleman, dosya_adi, dosya_tam_yolu))
+    # Yeni ID'ler bu sırayla verilir; os.listdir sırası dosya sistemine göre değişir
+    return sorted(kaynaklar)
+
+def ozetleri_hesapla(kayit, kaynaklar, isci=KOPYALAMA_ISCI):
+    """{tam yol: içerik özeti}; değişmeyen dosyalar kayıttaki özetle geçilir, diğerleri paralel okunur."""
+    ozetler, okunacak = {}, []
+    for katilimci_adi, dosya_adi, dosya_tam_yolu in kaynaklar:
+        anahtar = f"{katilimci_adi}/{dosya_adi}"
+        ozet = kayit.cached_hash(anahtar, dosya_tam_yolu)
+        if ozet is None:
+            okunacak.append((anahtar, dosya_tam_yolu))
+        else:
+            ozetler[dosya_tam_yolu] = ozet
+    if okunacak:
+        print(f"{len(okunacak)} dosyanın içerik özeti hesaplanıyor...")
+        with ThreadPoolExecutor(max_workers=max(1, isci)) as havuz:
+            for (anahtar, yol), ozet in zip(okunacak, havuz.map(lambda is_: kayit.hash_file(*is_), okunacak)):
+                ozetler[yol] = ozet
+    kayit.forget_missing(f"{k}/{d}" for k, d, _ in kaynaklar)
+    return ozetler
+
+def eski_idleri_aktar(kayit, eski_eslesme, kaynaklar, ozetler):
+    """Kayıt yokken: önceki eşleşmedeki ID'ler aynı içeriğe tekrar verilsin."""
+    aktarilan = 0
+    for katilimci_adi, dosya_adi, dosya_tam_yolu in kaynaklar:
+        eski_ad = eski_eslesme.get((katilimci_adi, dosya_adi))
+        m = ID_KALIBI.match(eski_ad) if eski_ad else None
+        if m:
+            kaynak = f"{katilimci_adi}/{dosya_adi}"
+            anahtar = ozetler[dosya_tam_yolu]
+            if kayit.lookup(anahtar) is not None:
+                # Aynı içeriğin ikinci kopyası (allocate_all ile aynı anahtar)
+                anahtar = f"{anahtar}:{kaynak}"
+            kayit.assign(anahtar, int(m.group(1)), kaynak)
+            aktarilan += 1
+    if aktarilan:
+        print(f"{aktarilan} ID önceki eşleşme listesinden kayda aktarıldı.")
+
+def guncel_mi(kaynak, hedef):
+    """Hedef, kaynağın copy2 ile alınmış aynı kopyası mı (boyut ve değişiklik zamanı)"""
+    try:
+        k, h = os.stat(kaynak), os.stat(hedef)
+    except FileNotFoundError:
+        return False
+    return k.st_size == h.st_size and int(k.st_mtime) == int(h.st_mtime)
+
+def kopyala(kaynak, hedef):
+    # Yarıda kesilen kopya eksik dosya bırakmasın: önce geçici isme, sonra yerine
+    gecici = hedef + ".tmp"
+    shutil.copy2(kaynak, gecici)
+    os.replace(gecici, hedef)
+    return hedef
+
+def havuzu_temizle(juri_klasor_yolu):
+    print(f"Klasör temizleniyor: {juri_klasor_yolu}")
+    for dosya in os.listdir(juri_klasor_yolu):
+        dosya_yolu = os.path.join(juri_klasor_yolu, dosya)
         try:
-            df.to_excel(EXCEL_DOSYA_YOLU, index=False)
-            print(f"Başarılı: {EXCEL_DOSYA_YOLU} dosyasına kaydedildi.")
-            print(f"Toplam {len(kayitlar)} fotoğraf işlendi.")
+            if os.path.isfile(dosya_yolu) or os.path.islink(dosya_yolu):
+                os.unlink(dosya_yolu)
+            elif os.path.isdir(dosya_yolu):
+                shutil.rmtree(dosya_yolu)
         except Exception as e:
-            print(f"Excel kaydederken hata oluştu: {e}")
-    else:
-        print("Hiçbir geçerli fotoğraf bulunamadı, Excel dosyası oluşturulmadı.")
+            print(f"Dosya silinirken hata: {e}")
+
+def havuzu_esitle(ana_dizin=ANA_DIZIN, temiz=False, isci=KOPYALAMA_ISCI, id_genislik=ID_WIDTH,
+                  kopya_modu='isaretle', benzerlik_esigi=BENZERLIK_ESIGI, db_yolu=None, excel=False):
+    """
+    Jüri havuzunu katılımcı klasörleriyle eşitler. ID'ler içerik özetine göre
+    kalıcı kayıttan verilir: aynı fotoğraf hep aynı ID'yi alır, yeni
+    fotoğraflara sıradaki numara verilir. Sadece yeni/değişen dosyalar
+    (paralel) kopyalanır, havuzda artık karşılığı olmayanlar silinir.
+    temiz=True: havuzu ve kaydı silip her şeyi baştan numaralandırır.
+    kopya_modu: aynı/çok benzer fotoğraflar 'isaretle' (listede işaretlenir),
+    'atla' (havuza alınmaz) ya da 'kapali' (kontrol yapılmaz).
+    Eşleşme ortak veritabanına (varsayılan: datastore.DB_PATH)
+    yazılır; excel=True ise KATILIMCI_ESLESME_LISTESI.xlsx de üretilir.
+    """
+    juri_klasor_yolu = os.path.join(ana_dizin, JURI_KLASOR_ADI)
+    excel_dosya_yolu = os.path.join(ana_dizin, EXCEL_DOSYA_ADI)
+    kayit_yolu = os.path.join(ana_dizin, ID_KAYIT_DOSYA_ADI)
+    db_yolu = db_yolu or datastore.DB_PATH
+
+    print(f"--- İşlem Başlıyor ---")
+    print(f"Ana Dizin: {ana_dizin}")
+
+    # Ana dizin kontrolü
+    if not os.path.exists(ana_dizin):
+        print(f"HATA: Ana dizin bulunamadı: {ana_dizin}")
+        print("Lütfen harici diskin takılı ve yolun doğru olduğundan emin olun.")
+        return
+
+    # 2. Jüri klasörünü oluştur (veya istenirse temizle)
+    if not os.path.exists(juri_klasor_yolu):
+        print(f"Klasör oluşturuluyor: {juri_klasor_yolu}")
+        os.makedirs(juri_klasor_yolu)
+    elif temiz:
+        havuzu_temizle(juri_klasor_yolu)
+        if os.path.exists(kayit_yolu):
+            os.remove(kayit_yolu)
+
+    kayit = IdRegistry(kayit_yolu, width=id_genislik)
+
+    # 3. Katılımcı klasörlerini tara; başlıkları kontrol et (paralel, resim çözülmeden)
+    # ve geçersiz dosyaları özet/kopya/kopyalama aşamalarına sokma
+    tum_kaynaklar = kaynaklari_tara(ana_dizin, JURI_KLASOR_ADI)
+    bilgiler, hatalar = check_all([yol for _, _, yol in tum_kaynaklar], workers=isci, max_bytes=EN_BUYUK_DOSYA)
+    for katilimci_adi, dosya_adi, dosya_tam_yolu in tum_kaynaklar:
+        if dosya_tam_yolu in hatalar:
+            print(f"  REDDEDİLDİ: {katilimci_adi}/{dosya_adi}: {hatalar[dosya_tam_yolu]}")
+    kaynaklar = [k for k in tum_kaynaklar if k[2] in bilgiler]
+
+    # İçerik özetlerini çıkar
+    ozetler = ozetleri_hesapla(kayit, kaynaklar, isci)
+    if not kayit.exists and not temiz:
+        eski_idleri_aktar(kayit, eslesmeyi_oku(db_yolu, excel_dosya_yolu), kaynaklar, ozetler)
+
+    # 4. Aynı ve benzer fotoğrafları bul; önceliği küçük ID'li (önce gelen) fotoğraf alır
+    kopyalar = {}
+    if kopya_modu != 'kapali':
+        sira = sorted(kaynaklar, key=lambda k: (kayit.lookup(ozetler[k[2]]) or float('inf'), k))
+        kopyalar = find_duplicates([yol for _, _, yol in sira], ozetler, threshold=benzerlik_esigi,
+                                   cache_path=os.path.join(ana_dizin, PHASH_ONBELLEK_DOSYA_ADI), workers=isci)
+        if kopyalar:
+            islem = "havuza alınmayacak" if kopya_modu == 'atla' else "eşleşme listesinde işaretlenecek"
+            print(f"{len(kopyalar)} fotoğraf başka bir fotoğrafın kopyası ya da çok benzeri ({islem}).")
+
+    # 5. ID'leri belirle: kayıtlı içerik aynı ID'yi alır, yeniler sıradaki numarayı
+    havuza = [k for k in kaynaklar if not (kopya_modu == 'atla' and k[2] in kopyalar)]
+    numaralar = kayit.allocate_all([(f"{k}/{d}", ozetler[yol]) for k, d, yol in havuza])
+    juri_adlari = {}
+    for katilimci_adi, dosya_adi, dosya_tam_yolu in havuza:
+        # Orijinal uzantıyı koru (büyük/küçük harf duyarlı olabilir, dosya isminden alalım)
+        orijinal_uzanti = os.path.splitext(dosya_adi)[1]
+        juri_adlari[dosya_tam_yolu] = kayit.name(numaralar[f"{katilimci_adi}/{dosya_adi}"], orijinal_uzanti)
+
+    def foto_id(yol):
+        return os.path.splitext(juri_adlari[yol])[0] if yol in juri_adlari else None
+
+    kayitlar = []
+    for katilimci_adi, dosya_adi, dosya_tam_yolu in tum_kaynaklar:
+        bilgi = bilgiler.get(dosya_tam_yolu, {})
+        tur, asil, mesafe = kopyalar.get(dosya_tam_yolu, (None, None, None))
+        kayitlar.append({
+            'source': f"{katilimci_adi}/{dosya_adi}",
+            'photo_id': foto_id(dosya_tam_yolu),
+            'jury_file': juri_adlari.get(dosya_tam_yolu),
+            'participant': katilimci_adi,
+            'original_name': dosya_adi,
+            'content_hash': ozetler.get(dosya_tam_yolu),
+            'width': bilgi.get('width'),
+            'height': bilgi.get('height'),
+            'bytes': bilgi.get('bytes'),
+            'orientation': bilgi.get('orientation'),
+            'captured_at': bilgi['captured_at'].isoformat() if bilgi.get('captured_at') else None,
+            'reject_reason': hatalar.get(dosya_tam_yolu),
+            'duplicate_kind': tur,
+            'duplicate_of': foto_id(asil) if asil else None,
+            'hamming': mesafe,
+            '_kaynak': dosya_tam_yolu,
+        })
+    havuzdakiler = [k for k in kayitlar if k['jury_file']]
+
+    kayit.save()
+
+    # 6. Sahipsiz dosyaları sil (kaynağı kaldırılmış fotoğraflar, yarım kopyalar)
+    gecerli = {k['jury_file'] for k in havuzdakiler}
+    silinen = 0
+    for dosya in os.listdir(juri_klasor_yolu):
+        dosya_yolu = os.path.join(juri_klasor_yolu, dosya)
+        if dosya not in gecerli and os.path.isfile(dosya_yolu):
+            os.unlink(dosya_yolu)
+            silinen += 1
+            print(f"  -> Silindi: {dosya}")
+
+    # 7. Sadece yeni veya değişen dosyaları paralel KOPYALA
+    isler = [
+        (k['_kaynak'], os.path.join(juri_klasor_yolu, k['jury_file']))
+        for k in havuzdakiler
+        if not guncel_mi(k['_kaynak'], os.path.join(juri_klasor_yolu, k['jury_file']))
+    ]
+    print(f"\n{len(havuzdakiler)} fotoğraf: {len(isler)} kopyalanacak, {len(havuzdakiler) - len(isler)} güncel, {silinen} silindi.")
+    hatali = set()
+    with ThreadPoolExecutor(max_workers=max(1, isci)) as havuz:
+        gorevler = {havuz.submit(kopyala, kaynak, hedef): kaynak for kaynak, hedef in isler}
+        for gorev in as_completed(gorevler):
+            try:
+                print(f"  -> Kopyalandı: {os.path.basename(gorev.result())}")
+            except Exception as e:
+                hatali.add(gorevler[gorev])
+                print(f"  HATA: {gorevler[gorev]} kopyalanamadı: {e}")
+
+    # 8. Eşleşmeyi veritabanına kaydet (Excel sadece istenirse, veritabanından üretilir);
+    # kopyalanamayanlar da ID'lerini korusun
+    conn = datastore.connect(db_yolu)
+    try:
+        datastore.replace_participants(conn, kayitlar)
+        print(f"\nEşleşme kaydedildi: {db_yolu} ({len(kayitlar)} fotoğraf)")
+        if excel:
+            print("\n--- Excel Dosyası Oluşturuluyor ---")
+            kaydedilen = datastore.export_excel(datastore.participants_frame(conn), excel_dosya_yolu)
+            print(f"Başarılı: {kaydedilen} dosyasına kaydedildi.")
+    finally:
+        conn.close()
+    if hatalar:
+        print(f"UYARI: {len(hatalar)} dosya geçersiz olduğu için havuza alınmadı (nedenleri: reject_reason / 'Reddedilme Nedeni').")
+    if hatali:
+        print(f"UYARI: {len(hatali)} dosya kopyalanamadı; tekrar çalıştırınca yeniden denenir.")
 
     print("\n--- İşlem Tamamlandı ---")
 
+def main():
+    parser = argparse.ArgumentParser(description="Katılımcı fotoğraflarını anonim ID'lerle jüri havuzuna kopyalar.")
+    parser.add_argument("--ana-dizin", default=ANA_DIZIN, help="Katılımcı klasörlerinin bulunduğu dizin")
+    parser.add_argument("--temiz", action="store_true", help="Havuzu silip her şeyi baştan kopyala ve numaralandır")
+    parser.add_argument("--isci", type=int, default=KOPYALAMA_ISCI, help="Paralel kopya/okuma sayısı")
+    parser.add_argument("--id-genislik", type=int, default=ID_WIDTH,
+                        help="ID numarasının hane sayısı (örn. 4 -> YARISMA_ID_0001); yeni kayıtta geçerli olur")
+    parser.add_argument("--kopya", choices=['isaretle', 'atla', 'kapali'], default='isaretle',
+                        help="Aynı/çok benzer fotoğraflar: listede işaretle, havuza alma ya da kontrol etme")
+    parser.add_argument("--benzerlik-esigi", type=int, default=BENZERLIK_ESIGI,
+                        help="pHash Hamming mesafesi bundan küçükse çok benzer sayılır (0: sadece aynı dosyalar)")
+    parser.add_argument("--db", default=datastore.DB_PATH, help="Ortak veritabanı (YARISMA_DB ortam değişkeniyle de verilebilir)")
+    parser.add_argument("--excel", action="store_true", help=f"Eşleşmeyi {EXCEL_DOSYA_ADI} olarak da kaydet")
+    args = parser.parse_args()
+    havuzu_esitle(args.ana_dizin, temiz=args.temiz, isci=args.isci, id_genislik=args.id_genislik,
+                  kopya_modu=args.kopya, benzerlik_esigi=args.benzerlik_esigi, db_yolu=args.db, excel=args.excel)
+
 if __name__ == "__main__":
     main()